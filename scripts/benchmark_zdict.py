@@ -0,0 +1,82 @@
+"""
+Compare compression ratio and CPU cost of ZlibDictCodec against plain zlib.
+
+Usage:
+    python scripts/benchmark_zdict.py [--samples FILE] [--train N] [--sizes 1024,4096,32768]
+
+FILE holds one sample message per line (e.g. JSON lines). Without it, synthetic
+JSON events are generated. The first N messages train the dictionary; the rest
+are used for measuring.
+"""
+
+import argparse
+import json
+import random
+import time
+
+from rmqaio import ZlibCodec, ZlibDictCodec, train_zlib_dictionary
+
+
+def synthetic_events(count: int) -> list[bytes]:
+    rnd = random.Random(0)
+    events = []
+    for i in range(count):
+        event = {
+            "event": rnd.choice(["user.login", "user.logout", "order.created", "order.paid"]),
+            "user_id": rnd.randint(1, 10**6),
+            "ts": 1700000000 + i,
+            "ip": f"10.0.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}",
+            "agent": rnd.choice(["Mozilla/5.0 (X11; Linux x86_64)", "curl/8.1.2", "python-httpx/0.27"]),
+            "session": {"id": f"{rnd.getrandbits(64):016x}", "new": rnd.random() < 0.5},
+            "tags": rnd.sample(["web", "mobile", "eu-west-1", "us-east-1", "beta"], 2),
+        }
+        events.append(json.dumps(event).encode())
+    return events
+
+
+def measure(name: str, codec, messages: list[bytes]):
+    headers: dict = {}
+    start = time.perf_counter()
+    compressed = [codec.compress(message, headers) for message in messages]
+    compress_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for data in compressed:
+        codec.decompress(data, headers)
+    decompress_time = time.perf_counter() - start
+
+    ratio = sum(map(len, messages)) / sum(map(len, compressed))
+    print(
+        f"{name:<24} ratio {ratio:6.2f}  "
+        f"compress {compress_time / len(messages) * 1e6:8.1f} us/msg  "
+        f"decompress {decompress_time / len(messages) * 1e6:8.1f} us/msg"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", help="file with one sample message per line")
+    parser.add_argument("--train", type=int, default=1000, help="number of messages used for training")
+    parser.add_argument("--sizes", default="1024,4096,32768", help="dictionary sizes")
+    args = parser.parse_args()
+
+    if args.samples:
+        with open(args.samples, "rb") as f:
+            messages = [line.rstrip(b"\n") for line in f if line.strip()]
+    else:
+        messages = synthetic_events(args.train + 10000)
+
+    samples, messages = messages[: args.train], messages[args.train :]
+    average = sum(map(len, messages)) / len(messages)
+    print(f"{len(samples)} training samples, {len(messages)} messages, avg size {average:.0f} B")
+
+    measure("zlib", ZlibCodec(), messages)
+    for size in map(int, args.sizes.split(",")):
+        start = time.perf_counter()
+        zdict = train_zlib_dictionary(samples, size=size)
+        train_time = time.perf_counter() - start
+        measure(f"zlib-dict {len(zdict)} B ({train_time:.1f}s)", ZlibDictCodec({"1": zdict}), messages)
+
+
+if __name__ == "__main__":
+    main()
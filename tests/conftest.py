@@ -3,6 +3,7 @@ import locale
 import logging
 import sys
 
+from contextlib import asynccontextmanager
 from os import path
 from unittest import mock
 from unittest.mock import AsyncMock, MagicMock
@@ -126,7 +127,7 @@ async def mock_aiormq():
         conn.channel = AsyncMock(side_effect=lambda *args, **kwargs: make_mock_channel())
         return conn
 
-    with mock.patch("aiormq.connect", new_callable=AsyncMock, side_effect=lambda *a, **k: make_conn()) as m:
+    with mock.patch("aiormq.Connection", side_effect=lambda *a, **k: make_conn()) as m:
         yield m
 
 
@@ -156,6 +157,13 @@ def mock_conn(mock_channel):
     conn.set_callback = MagicMock()
     conn.is_open = True
     conn.is_closed = False
+    conn.flow_state = rmqaio.FlowState.FLOWING
     conn.channel = AsyncMock(return_value=mock_channel)
     conn.new_channel = AsyncMock(return_value=mock_channel)
+
+    @asynccontextmanager
+    async def acquire_channel(timeout=None):
+        yield mock_channel
+
+    conn.acquire_channel = MagicMock(side_effect=acquire_channel)
     return conn
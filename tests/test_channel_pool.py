@@ -0,0 +1,127 @@
+import asyncio
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from rmqaio import ChannelPool, Connection, Ops
+from rmqaio.rmqaio import _split_body
+
+
+def make_channel():
+    channel = AsyncMock()
+    channel.is_closed = False
+    return channel
+
+
+@pytest.fixture
+def factory():
+    return AsyncMock(side_effect=lambda timeout: make_channel())
+
+
+class TestChannelPool:
+    def test_invalid_size(self, factory):
+        with pytest.raises(ValueError, match="channel pool size must be positive"):
+            ChannelPool(factory, size=0)
+
+    @pytest.mark.asyncio
+    async def test_acquire_reuses_channel(self, factory):
+        pool = ChannelPool(factory, size=2)
+        async with pool.acquire() as ch1:
+            assert pool.in_use == 1
+        async with pool.acquire() as ch2:
+            pass
+        assert ch1 is ch2
+        assert pool.in_use == 0
+        factory.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_acquire_concurrent_channels(self, factory):
+        pool = ChannelPool(factory, size=2)
+        async with pool.acquire() as ch1:
+            async with pool.acquire() as ch2:
+                assert ch1 is not ch2
+                assert pool.in_use == 2
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_when_exhausted(self, factory):
+        pool = ChannelPool(factory, size=1)
+        async with pool.acquire():
+            with pytest.raises(asyncio.TimeoutError):
+                async with pool.acquire(timeout=0.01):
+                    pass
+        async with pool.acquire(timeout=0.01):
+            pass
+
+    @pytest.mark.asyncio
+    async def test_closed_channel_replaced(self, factory):
+        pool = ChannelPool(factory, size=1)
+        async with pool.acquire() as ch1:
+            ch1.is_closed = True
+        async with pool.acquire() as ch2:
+            pass
+        assert ch1 is not ch2
+        assert factory.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_clear_forgets_acquired_channels(self, factory):
+        pool = ChannelPool(factory, size=1)
+        async with pool.acquire() as ch1:
+            pool.clear()
+        async with pool.acquire() as ch2:
+            pass
+        assert ch1 is not ch2
+
+    @pytest.mark.asyncio
+    async def test_close(self, factory):
+        pool = ChannelPool(factory, size=1)
+        async with pool.acquire() as channel:
+            pass
+        await pool.close()
+        channel.close.assert_awaited_once()
+
+
+class TestConnectionChannelPool:
+    @pytest.mark.asyncio
+    async def test_acquire_channel(self, mock_aiormq):
+        conn = Connection("amqp://admin@example.com", channel_pool_size=2)
+        assert conn.channel_pool_size == 2
+        async with conn.acquire_channel() as ch1:
+            async with conn.acquire_channel() as ch2:
+                assert ch1 is not ch2
+                assert ch1 is not await conn.channel()
+        async with conn.acquire_channel() as ch3:
+            assert ch3 in (ch1, ch2)
+        await conn.close()
+
+    @pytest.mark.asyncio
+    async def test_acquire_channel_opens_connection(self, mock_aiormq):
+        conn = Connection("amqp://admin@example.com")
+        async with conn.acquire_channel():
+            assert conn.is_open
+        await conn.close()
+
+    @pytest.mark.asyncio
+    async def test_acquire_channel_setup(self, mock_aiormq):
+        conn = Connection("amqp://admin@example.com")
+        async with conn.acquire_channel() as channel:
+            assert channel._split_body.func is _split_body
+        await conn.close()
+
+    @pytest.mark.asyncio
+    async def test_close_closes_pool_channels(self, mock_aiormq):
+        conn = Connection("amqp://admin@example.com")
+        async with conn.acquire_channel() as channel:
+            pass
+        await conn.close()
+        channel.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_publish_uses_pool(self, mock_aiormq):
+        conn = Connection("amqp://admin@example.com", channel_pool_size=2)
+        ops = Ops(conn)
+        await ops.publish("exchange", b"data", "key")
+        async with conn.acquire_channel() as channel:
+            channel.basic_publish.assert_awaited_once()
+        (await conn.channel()).basic_publish.assert_not_awaited()
+        await conn.close()
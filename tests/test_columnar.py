@@ -0,0 +1,168 @@
+import asyncio
+
+from unittest.mock import AsyncMock, MagicMock
+
+import aiormq
+import pytest
+
+from pamqp.header import ContentHeader
+
+from rmqaio import (
+    BasicProperties,
+    BatchPublisher,
+    ColumnarBatch,
+    ColumnarSerializer,
+    ConsumerSpec,
+    Exchange,
+    ExchangeSpec,
+    Ops,
+    RecordSchema,
+)
+
+
+SCHEMA = RecordSchema([("ts", "d"), ("id", "Q"), ("cpu", "f"), ("delta", "b")])
+
+RECORDS = [(1700000000.5, 1, 0.25, -1), (1700000001.5, 2, 0.5, 0), (1700000002.5, 3, 0.75, 1)]
+
+
+@pytest.fixture
+def exchange():
+    return Exchange(ExchangeSpec(name="telemetry"), AsyncMock())
+
+
+class TestRecordSchema:
+    def test_names(self):
+        assert SCHEMA.names == ["ts", "id", "cpu", "delta"]
+        assert SCHEMA == RecordSchema([["ts", "d"], ["id", "Q"], ["cpu", "f"], ["delta", "b"]])
+
+    @pytest.mark.parametrize("fields", [[("a", "u")], [("a", "l")], [("a", "d"), ("a", "d")]])
+    def test_invalid(self, fields):
+        with pytest.raises(ValueError):
+            RecordSchema(fields)
+
+    def test_encode_invalid(self):
+        with pytest.raises(ValueError, match="expected 4 columns, got 1"):
+            SCHEMA.encode([[1]])
+        with pytest.raises(ValueError, match="columns must have the same length"):
+            SCHEMA.encode([[1.0], [1], [1.0], []])
+
+
+class TestColumnarBatch:
+    def test_records(self):
+        batch = ColumnarBatch(SCHEMA.encode_records(RECORDS))
+        assert len(batch) == 3
+        assert batch.schema == SCHEMA
+        assert batch[0] == RECORDS[0]
+        assert batch[-1] == RECORDS[-1]
+        assert batch[1:] == RECORDS[1:]
+        assert list(batch) == RECORDS
+        with pytest.raises(IndexError):
+            batch[3]
+
+    def test_column_zero_copy(self):
+        data = bytearray(SCHEMA.encode(list(zip(*RECORDS))))
+        batch = ColumnarBatch(data)
+        column = batch.column("id")
+        assert column.tolist() == [1, 2, 3]
+        assert column.obj is data
+
+    def test_empty(self):
+        batch = ColumnarBatch(SCHEMA.encode_records([]))
+        assert len(batch) == 0
+        assert list(batch) == []
+
+    def test_invalid(self):
+        with pytest.raises(ValueError, match="invalid columnar batch"):
+            ColumnarBatch(b"XXXX" + bytes(16))
+        with pytest.raises(ValueError, match="invalid columnar batch"):
+            ColumnarBatch(SCHEMA.encode_records(RECORDS)[:-8])
+
+    def test_serializer(self):
+        serializer = ColumnarSerializer()
+        batch = ColumnarBatch(SCHEMA.encode_records(RECORDS))
+        assert list(serializer.loads(serializer.dumps(batch))) == RECORDS
+        with pytest.raises(TypeError):
+            serializer.dumps(RECORDS)
+
+    @pytest.mark.asyncio
+    async def test_consume(self, mock_conn):
+        received = []
+
+        async def callback(channel, message):
+            received.append(message.body)
+
+        ops = Ops(mock_conn)
+        spec = ConsumerSpec(queue="queue", callback=callback, serializer=ColumnarSerializer.content_type)
+        on_message = ops._on_message(spec, None)
+        body = SCHEMA.encode_records(RECORDS)
+        header = ContentHeader(body_size=len(body), properties=BasicProperties())
+        await on_message(aiormq.abc.DeliveredMessage(delivery=None, header=header, body=body, channel=MagicMock()))
+        assert isinstance(received[0], ColumnarBatch)
+        assert list(received[0]) == RECORDS
+
+
+class TestBatchPublisher:
+    @pytest.mark.asyncio
+    async def test_max_records(self, exchange):
+        publisher = BatchPublisher(exchange, SCHEMA, "host1", max_records=2, max_delay=60)
+        await publisher.add_many(RECORDS)
+        exchange.ops.publish.assert_awaited_once()
+        call = exchange.ops.publish.call_args
+        assert call.args[0] == "telemetry"
+        assert list(ColumnarBatch(call.args[1])) == RECORDS[:2]
+        assert call.args[2] == "host1"
+        assert call.kwargs["properties"] == {"content_type": "application/x-rmqaio-columnar"}
+        assert publisher.size == 1
+
+        await publisher.close()
+        assert exchange.ops.publish.await_count == 2
+        assert list(ColumnarBatch(exchange.ops.publish.call_args.args[1])) == RECORDS[2:]
+        assert publisher.size == 0
+
+    @pytest.mark.asyncio
+    async def test_max_delay(self, exchange):
+        publisher = BatchPublisher(exchange, SCHEMA, "host1", max_delay=0.01)
+        await publisher.add(RECORDS[0])
+        exchange.ops.publish.assert_not_awaited()
+        await asyncio.sleep(0.05)
+        exchange.ops.publish.assert_awaited_once()
+        await publisher.close()
+        exchange.ops.publish.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_invalid_record(self, exchange):
+        publisher = BatchPublisher(exchange, SCHEMA, "host1")
+        with pytest.raises(ValueError, match="expected 4 values, got 1"):
+            await publisher.add((1.0,))
+        with pytest.raises(TypeError):
+            await publisher.add((1.0, 1, "cpu", 0))
+        assert publisher.size == 0
+        await publisher.add(RECORDS[0])
+        await publisher.close()
+        assert list(ColumnarBatch(exchange.ops.publish.call_args.args[1])) == RECORDS[:1]
+
+    @pytest.mark.asyncio
+    async def test_publish_error_keeps_records(self, exchange):
+        publisher = BatchPublisher(exchange, SCHEMA, "host1", max_records=2, max_delay=60)
+        exchange.ops.publish.side_effect = [ConnectionError("lost"), None]
+        await publisher.add(RECORDS[0])
+        with pytest.raises(ConnectionError):
+            await publisher.add(RECORDS[1])
+        assert publisher.size == 2
+        await publisher.add(RECORDS[2])
+        assert list(ColumnarBatch(exchange.ops.publish.call_args.args[1])) == RECORDS
+        assert publisher.size == 0
+        await publisher.close()
+
+    @pytest.mark.asyncio
+    async def test_exchange_serializer(self):
+        exchange = Exchange(ExchangeSpec(name="telemetry"), AsyncMock(), serializer=ColumnarSerializer.content_type)
+        publisher = BatchPublisher(exchange, SCHEMA, "host1")
+        await publisher.add(RECORDS[0])
+        await publisher.close()
+        assert list(ColumnarBatch(exchange.ops.publish.call_args.args[1])) == RECORDS[:1]
+
+    def test_exchange_other_serializer(self):
+        exchange = Exchange(ExchangeSpec(name="telemetry"), AsyncMock(), serializer="application/json")
+        with pytest.raises(ValueError, match="exchange serializer must be ColumnarSerializer"):
+            BatchPublisher(exchange, SCHEMA, "host1")
@@ -0,0 +1,220 @@
+import json
+import zlib
+
+from unittest.mock import AsyncMock, MagicMock
+
+import aiormq
+import pytest
+
+from pamqp.header import ContentHeader
+
+from rmqaio import (
+    BasicProperties,
+    Compression,
+    CompressionCodec,
+    Config,
+    ConsumerSpec,
+    Exchange,
+    ExchangeSpec,
+    MessageTemplate,
+    Ops,
+    ZlibDictCodec,
+    get_compression_codec,
+    register_compression_codec,
+    train_zlib_dictionary,
+)
+from rmqaio.rmqaio import _compression_codecs
+
+
+DATA = b'{"user": "alice", "action": "login"}' * 100
+
+
+class ReverseCodec(CompressionCodec):
+    encoding = "reverse"
+
+    def compress(self, data, headers):
+        headers["x-reversed"] = 1
+        return bytes(data)[::-1]
+
+    def decompress(self, data, headers):
+        assert headers["x-reversed"] == 1
+        return bytes(data)[::-1]
+
+
+@pytest.fixture
+def reverse_codec():
+    register_compression_codec(ReverseCodec())
+    yield
+    _compression_codecs.pop("reverse")
+
+
+@pytest.fixture
+def exchange():
+    ops = AsyncMock()
+    return Exchange(ExchangeSpec(name="test"), ops, compression=Compression(threshold=100))
+
+
+def publish_args(exchange):
+    call = exchange.ops.publish.call_args
+    return call.args[1], call.kwargs["properties"]
+
+
+class TestCodecs:
+    @pytest.mark.parametrize("encoding", ["zlib", "bz2", "lzma"])
+    def test_roundtrip(self, encoding):
+        codec = get_compression_codec(encoding)
+        compressed = codec.compress(memoryview(DATA), {})
+        assert len(compressed) < len(DATA)
+        assert codec.decompress(compressed, {}) == DATA
+
+    def test_unknown(self):
+        with pytest.raises(ValueError, match="unknown compression codec 'unknown'"):
+            get_compression_codec("unknown")
+
+    def test_register(self, reverse_codec):
+        assert isinstance(get_compression_codec("reverse"), ReverseCodec)
+
+
+def events(start, count):
+    return [
+        json.dumps(
+            {"event": "user.login", "user_id": i * 7919 % 100000, "ts": 1700000000 + i, "tags": ["web"]}
+        ).encode()
+        for i in range(start, start + count)
+    ]
+
+
+class TestZlibDictCodec:
+    def test_train(self):
+        zdict = train_zlib_dictionary(events(0, 200), size=1024)
+        assert 0 < len(zdict) <= 1024
+        codec = ZlibDictCodec({"1": zdict})
+        messages = events(1000, 100)
+        with_dict = sum(len(codec.compress(message, {})) for message in messages)
+        plain = sum(len(zlib.compress(message)) for message in messages)
+        assert with_dict < plain / 2
+
+    def test_roundtrip(self):
+        codec = ZlibDictCodec({"1": b"user.login", "2": b"user_id"}, version="1")
+        headers = {}
+        data = codec.compress(b'{"event": "user.login"}', headers)
+        assert headers == {"x-zdict-version": "1"}
+        assert codec.decompress(data, headers) == b'{"event": "user.login"}'
+
+    def test_versions(self):
+        codec = ZlibDictCodec({"1": b"user.login"})
+        old = codec.compress(b"user.login", {})
+        codec.add_dictionary("2", b"order.created")
+        assert codec.version == "2"
+        assert codec.versions == ["1", "2"]
+        headers = {}
+        new = codec.compress(b"order.created", headers)
+        assert headers["x-zdict-version"] == "2"
+        assert codec.decompress(old, {"x-zdict-version": "1"}) == b"user.login"
+        assert codec.decompress(new, {"x-zdict-version": b"2"}) == b"order.created"
+
+    def test_unknown_version(self):
+        codec = ZlibDictCodec({"1": b"user.login"})
+        with pytest.raises(ValueError, match="unknown zlib dictionary version '3'"):
+            codec.decompress(b"", {"x-zdict-version": "3"})
+        with pytest.raises(ValueError, match="unknown zlib dictionary version '3'"):
+            ZlibDictCodec({"1": b"user.login"}, version="3")
+
+    def test_no_dictionary(self):
+        with pytest.raises(ValueError, match="no zlib dictionary"):
+            ZlibDictCodec().compress(b"data", {})
+
+
+class TestPublishCompression:
+    @pytest.mark.asyncio
+    async def test_below_threshold(self, exchange):
+        await exchange.publish(b"small", "key", properties={"delivery_mode": 2})
+        assert publish_args(exchange) == (b"small", {"delivery_mode": 2})
+
+    @pytest.mark.asyncio
+    async def test_dict_properties(self, exchange):
+        properties = {"headers": {"a": 1}}
+        await exchange.publish(DATA, "key", properties=properties)
+        data, sent = publish_args(exchange)
+        assert zlib.decompress(data) == DATA
+        assert sent == {"headers": {"a": 1}, "content_encoding": "zlib"}
+        assert properties == {"headers": {"a": 1}}
+
+    @pytest.mark.asyncio
+    async def test_basic_properties(self, exchange):
+        properties = BasicProperties(app_id="app")
+        await exchange.publish(DATA, "key", properties=properties)
+        _, sent = publish_args(exchange)
+        assert sent.content_encoding == "zlib"
+        assert sent.app_id == "app"
+        assert properties.content_encoding is None
+
+    @pytest.mark.asyncio
+    async def test_template(self, exchange):
+        template = MessageTemplate(app_id="app", headers={"a": 1})
+        await exchange.publish(DATA, "key", properties=template)
+        _, sent = publish_args(exchange)
+        assert sent.marshal() == BasicProperties(app_id="app", headers={"a": 1}, content_encoding="zlib").marshal()
+
+    @pytest.mark.asyncio
+    async def test_codec_headers(self, reverse_codec):
+        exchange = Exchange(ExchangeSpec(name="test"), AsyncMock(), compression=Compression("reverse", threshold=0))
+        await exchange.publish(b"abc", "key", properties={"headers": {"a": 1}})
+        assert publish_args(exchange) == (
+            b"cba",
+            {"headers": {"a": 1, "x-reversed": 1}, "content_encoding": "reverse"},
+        )
+
+    @pytest.mark.asyncio
+    async def test_executor(self, exchange, monkeypatch):
+        monkeypatch.setattr("rmqaio.rmqaio.config", Config(executor_threshold=0))
+        await exchange.publish(DATA, "key")
+        data, _ = publish_args(exchange)
+        assert zlib.decompress(data) == DATA
+
+
+class TestConsumeDecompression:
+    async def deliver(self, mock_conn, body, decompress=True, **properties):
+        received = []
+
+        async def callback(channel, message):
+            received.append(message.body)
+
+        ops = Ops(mock_conn)
+        on_message = ops._on_message(ConsumerSpec(queue="queue", callback=callback, decompress=decompress), None)
+        header = ContentHeader(body_size=len(body), properties=BasicProperties(**properties))
+        await on_message(aiormq.abc.DeliveredMessage(delivery=None, header=header, body=body, channel=MagicMock()))
+        return received[0]
+
+    @pytest.mark.asyncio
+    async def test_decompress(self, mock_conn):
+        assert await self.deliver(mock_conn, zlib.compress(DATA), content_encoding="zlib") == DATA
+
+    @pytest.mark.asyncio
+    async def test_codec_headers(self, mock_conn, reverse_codec):
+        body = await self.deliver(mock_conn, b"cba", content_encoding="reverse", headers={"x-reversed": 1})
+        assert body == b"abc"
+
+    @pytest.mark.asyncio
+    async def test_unknown_encoding(self, mock_conn):
+        assert await self.deliver(mock_conn, b"data", content_encoding="gzip") == b"data"
+
+    @pytest.mark.asyncio
+    async def test_zlib_dict(self, mock_conn):
+        codec = ZlibDictCodec({"1": b'{"event": "user.login"}'})
+        register_compression_codec(codec)
+        try:
+            headers = {}
+            body = codec.compress(b'{"event": "user.login"}', headers)
+            received = await self.deliver(mock_conn, body, content_encoding="zlib-dict", headers=headers)
+            assert received == b'{"event": "user.login"}'
+        finally:
+            _compression_codecs.pop("zlib-dict")
+
+    def test_disabled_by_default(self):
+        assert ConsumerSpec(queue="queue", callback=AsyncMock()).decompress is False
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, mock_conn):
+        body = zlib.compress(DATA)
+        assert await self.deliver(mock_conn, body, decompress=False, content_encoding="zlib") == body
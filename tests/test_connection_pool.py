@@ -0,0 +1,109 @@
+import zlib
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from rmqaio import ConnectionPool, ConnectionState, Ops
+
+
+class TestConnectionPool:
+    def test_init(self):
+        pool = ConnectionPool("amqp://admin@example.com", size=3, strategy="hash")
+        assert pool.size == 3
+        assert pool.strategy == "hash"
+        assert len(set(pool.connections)) == 3
+        assert pool.is_open is False
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError, match="connection pool size must be positive"):
+            ConnectionPool("amqp://admin@example.com", size=0)
+
+    def test_invalid_strategy(self):
+        with pytest.raises(ValueError, match="invalid connection pool strategy"):
+            ConnectionPool("amqp://admin@example.com", strategy="random")  # type: ignore
+
+    def test_str(self):
+        pool = ConnectionPool("amqp://admin@example.com:5672", size=2)
+        assert str(pool) == "ConnectionPool[example.com:5672][size=2]"
+
+    @pytest.mark.asyncio
+    async def test_open_close(self, mock_aiormq):
+        pool = ConnectionPool("amqp://admin@example.com", size=2)
+        await pool.open()
+        assert pool.is_open is True
+        assert all(conn.is_open for conn in pool.connections)
+        await pool.close()
+        assert pool.is_closed is True
+
+    @pytest.mark.asyncio
+    async def test_round_robin(self, mock_aiormq):
+        pool = ConnectionPool("amqp://admin@example.com", size=2)
+        await pool.open()
+        picked = [pool.pick() for _ in range(4)]
+        assert picked[0] is picked[2]
+        assert picked[1] is picked[3]
+        assert picked[0] is not picked[1]
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_round_robin_skips_closed_members(self, mock_aiormq):
+        pool = ConnectionPool("amqp://admin@example.com", size=2)
+        await pool.open()
+        closed, opened = pool.connections
+        await closed.close()
+        assert {pool.pick() for _ in range(4)} == {opened}
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_hash(self, mock_aiormq):
+        pool = ConnectionPool("amqp://admin@example.com", size=4, strategy="hash")
+        await pool.open()
+        assert all(pool.pick("user.1") is pool.pick("user.1") for _ in range(10))
+        ch1 = await pool.channel(key="user.1")
+        assert ch1 is await pool.connections[zlib.crc32(b"user.1") % 4].channel()
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_least_in_flight(self, mock_aiormq):
+        pool = ConnectionPool("amqp://admin@example.com", size=2, strategy="least-in-flight")
+        await pool.open()
+        busy, idle = pool.connections
+        channel = await busy.channel()
+        channel.confirmations = {1: MagicMock(), 2: MagicMock()}
+        assert pool.in_flight(busy) == 2
+        assert pool.pick() is idle
+        async with pool.acquire_channel():
+            assert pool.in_flight(idle) == 1
+            assert pool.pick() is idle
+            channel.confirmations.clear()
+            assert pool.pick() is busy
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_callbacks_set_on_every_member(self, mock_aiormq):
+        pool = ConnectionPool("amqp://admin@example.com", size=2)
+        states = []
+
+        async def callback(state_from, state_to):
+            states.append(state_to)
+
+        pool.set_callback("test", callback)
+        await pool.open()
+        assert states.count(ConnectionState.CONNECTED) == 2
+        await pool.remove_callback("test")
+        await pool.close()
+        assert ConnectionState.CLOSED not in states
+
+    @pytest.mark.asyncio
+    async def test_ops_publish_routing_key_affinity(self, mock_aiormq):
+        pool = ConnectionPool("amqp://admin@example.com", size=4, strategy="hash")
+        ops = Ops(pool)
+        await pool.open()
+        await ops.publish("exchange", b"data", "user.1")
+        async with pool.pick("user.1").acquire_channel() as channel:
+            channel.basic_publish.assert_awaited_once()
+        await ops.publish_many("exchange", [("user.1", b"data", None), ("user.2", b"data", None)])
+        channel = await pool.pick("user.1").channel()
+        channel.basic_publish.assert_awaited_once()
+        await pool.close()
@@ -0,0 +1,713 @@
+import asyncio
+
+from dataclasses import replace
+from unittest.mock import AsyncMock, MagicMock
+
+import aiormq
+import pytest
+
+from pamqp.header import ContentHeader
+
+from rmqaio import (
+    AckCoalescing,
+    AdaptivePrefetch,
+    BasicProperties,
+    BatchConsumerSpec,
+    Config,
+    ConnectionState,
+    ConsumerSpec,
+    MessageIterator,
+    OrderedDispatch,
+    Ops,
+    Queue,
+    QueueSpec,
+)
+
+
+def message(delivery_tag, body=b"data", routing_key="key"):
+    header = ContentHeader(body_size=len(body), properties=BasicProperties())
+    return aiormq.abc.DeliveredMessage(
+        delivery=aiormq.spec.Basic.Deliver(delivery_tag=delivery_tag, routing_key=routing_key),
+        header=header,
+        body=body,
+        channel=MagicMock(),
+    )
+
+
+@pytest.fixture
+def ops(mock_conn, mock_channel):
+    mock_channel.create_task = MagicMock(side_effect=asyncio.create_task)
+    mock_channel.basic_consume = AsyncMock(return_value=MagicMock(consumer_tag="test_tag"))
+    return Ops(mock_conn)
+
+
+def on_message(mock_channel):
+    return mock_channel.basic_consume.call_args.args[1]
+
+
+class TestConsumerConcurrency:
+    @pytest.mark.parametrize(
+        "kwds, error",
+        [
+            ({"concurrency": 0}, "concurrency must be positive"),
+            ({"concurrency": 2}, "concurrency requires auto_ack=False"),
+            ({"on_error": "drop", "auto_ack": False}, "invalid on_error policy 'drop'"),
+            ({"on_error": "requeue"}, "on_error requires auto_ack=False"),
+        ],
+    )
+    def test_invalid(self, kwds, error):
+        with pytest.raises(ValueError, match=error):
+            ConsumerSpec(queue="queue", callback=AsyncMock(), **kwds)
+
+    @pytest.mark.asyncio
+    async def test_workers(self, ops, mock_channel):
+        running = 0
+        max_running = 0
+        handled = []
+        release = asyncio.Event()
+
+        async def callback(channel, msg):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await release.wait()
+            running -= 1
+            handled.append(msg.delivery.delivery_tag)
+
+        consumer = await ops.consume(ConsumerSpec(queue="queue", callback=callback, auto_ack=False, concurrency=3))
+        mock_channel.basic_qos.assert_awaited_once_with(prefetch_count=3, prefetch_size=None, timeout=None)
+        assert mock_channel.create_task.call_count == 3
+
+        for tag in range(1, 11):
+            await on_message(mock_channel)(message(tag))
+        await asyncio.sleep(0.01)
+        assert running == 3
+        assert consumer._workers.pending == 7
+
+        release.set()
+        await ops.stop_consume("test_tag")
+        await asyncio.wait_for(asyncio.gather(*consumer._workers._tasks), timeout=1)
+        assert sorted(handled) == list(range(1, 11))
+        assert max_running == 3
+
+    @pytest.mark.asyncio
+    async def test_prefetch_count(self, ops, mock_channel):
+        await ops.consume(
+            ConsumerSpec(queue="queue", callback=AsyncMock(), auto_ack=False, prefetch_count=10, concurrency=2)
+        )
+        mock_channel.basic_qos.assert_awaited_once_with(prefetch_count=10, prefetch_size=None, timeout=None)
+        await ops.stop_consume()
+
+    @pytest.mark.asyncio
+    async def test_worker_error(self, ops, mock_channel):
+        handled = []
+
+        async def callback(channel, msg):
+            if msg.delivery.delivery_tag == 1:
+                raise RuntimeError
+            handled.append(msg.delivery.delivery_tag)
+
+        await ops.consume(ConsumerSpec(queue="queue", callback=callback, auto_ack=False, concurrency=1))
+        await on_message(mock_channel)(message(1))
+        await on_message(mock_channel)(message(2))
+        await asyncio.sleep(0.01)
+        assert handled == [2]
+        await ops.stop_consume()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("policy, requeue", [("requeue", True), ("reject", False)])
+    async def test_on_error(self, ops, mock_channel, policy, requeue):
+        async def callback(channel, msg):
+            raise RuntimeError
+
+        await ops.consume(ConsumerSpec(queue="queue", callback=callback, auto_ack=False, on_error=policy))
+        await on_message(mock_channel)(message(5))
+        mock_channel.basic_reject.assert_awaited_once_with(5, requeue=requeue)
+
+    @pytest.mark.asyncio
+    async def test_on_error_success(self, ops, mock_channel):
+        await ops.consume(ConsumerSpec(queue="queue", callback=AsyncMock(), auto_ack=False, on_error="requeue"))
+        await on_message(mock_channel)(message(5))
+        mock_channel.basic_reject.assert_not_awaited()
+
+
+class TestBatchConsumer:
+    @pytest.mark.parametrize(
+        "kwds, error",
+        [
+            ({"max_batch": 0}, "max_batch must be positive"),
+            ({"max_wait": -1}, "max_wait must not be negative"),
+            ({"on_error": None}, "batch consumer requires on_error policy"),
+        ],
+    )
+    def test_invalid(self, kwds, error):
+        with pytest.raises(ValueError, match=error):
+            BatchConsumerSpec(queue="queue", callback=AsyncMock(), **kwds)
+
+    def test_spec(self):
+        spec = BatchConsumerSpec(queue="queue", callback=AsyncMock())
+        assert spec.auto_ack is False
+        assert spec.concurrency is None
+        assert spec.on_error == "requeue"
+
+    @pytest.mark.asyncio
+    async def test_max_batch(self, ops, mock_channel):
+        batches = []
+
+        async def callback(channel, messages):
+            batches.append([msg.delivery.delivery_tag for msg in messages])
+
+        consumer = await Queue(QueueSpec(name="queue"), ops).consume_batch(callback, max_batch=3, max_wait=60)
+        mock_channel.basic_qos.assert_awaited_once_with(prefetch_count=3, prefetch_size=None, timeout=None)
+        assert mock_channel.basic_consume.call_args.kwargs["no_ack"] is False
+
+        for tag in range(1, 8):
+            await on_message(mock_channel)(message(tag))
+        await asyncio.sleep(0)
+        assert batches == [[1, 2, 3], [4, 5, 6]]
+        assert [call.args for call in mock_channel.basic_ack.await_args_list] == [(3,), (6,)]
+        assert all(call.kwargs == {"multiple": True} for call in mock_channel.basic_ack.await_args_list)
+
+        await ops.stop_consume()
+        await asyncio.wait_for(consumer._workers._task, timeout=1)
+        assert batches[-1] == [7]
+        mock_channel.basic_ack.assert_awaited_with(7, multiple=True)
+
+    @pytest.mark.asyncio
+    async def test_max_wait(self, ops, mock_channel):
+        batches = []
+
+        async def callback(channel, messages):
+            batches.append(len(messages))
+
+        await ops.consume(BatchConsumerSpec(queue="queue", callback=callback, max_wait=0.01))
+        await on_message(mock_channel)(message(1))
+        await on_message(mock_channel)(message(2))
+        assert batches == []
+        await asyncio.sleep(0.05)
+        assert batches == [2]
+        mock_channel.basic_ack.assert_awaited_once_with(2, multiple=True)
+        await ops.stop_consume()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("policy, requeue", [("requeue", True), ("reject", False)])
+    async def test_error(self, ops, mock_channel, policy, requeue):
+        async def callback(channel, messages):
+            raise RuntimeError
+
+        consumer = await ops.consume(
+            BatchConsumerSpec(
+                queue="queue", callback=callback, max_batch=2, on_error=policy, serializer="application/json"
+            )
+        )
+        await on_message(mock_channel)(message(1, b"1"))
+        await on_message(mock_channel)(message(2, b"2"))
+        await ops.stop_consume()
+        await asyncio.wait_for(consumer._workers._task, timeout=1)
+        mock_channel.basic_nack.assert_awaited_once_with(2, multiple=True, requeue=requeue)
+        mock_channel.basic_ack.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_delivery_order(self, ops, mock_channel, monkeypatch):
+        monkeypatch.setattr("rmqaio.rmqaio.config", Config(executor_threshold=100))
+        batches = []
+
+        async def callback(channel, messages):
+            batches.append([msg.body for msg in messages])
+
+        spec = BatchConsumerSpec(queue="queue", callback=callback, max_batch=2, serializer="application/json")
+        consumer = await ops.consume(spec)
+        # the large body is decoded in the executor, the small one inline
+        large = b'"' + b"x" * 1000 + b'"'
+        await asyncio.gather(
+            *(on_message(mock_channel)(message(tag, body)) for tag, body in enumerate([large, b"1", b"2"], 1))
+        )
+        await ops.stop_consume()
+        await asyncio.wait_for(consumer._workers._task, timeout=1)
+        assert batches == [["x" * 1000, 1], [2]]
+        assert [call.args for call in mock_channel.basic_ack.await_args_list] == [(2,), (3,)]
+
+    @pytest.mark.asyncio
+    async def test_decode_error(self, ops, mock_channel):
+        callback = AsyncMock()
+        consumer = await ops.consume(
+            BatchConsumerSpec(queue="queue", callback=callback, max_batch=2, serializer="application/json")
+        )
+        await on_message(mock_channel)(message(1, b"1"))
+        await on_message(mock_channel)(message(2, b"{"))
+        await ops.stop_consume()
+        await asyncio.wait_for(consumer._workers._task, timeout=1)
+        callback.assert_not_awaited()
+        mock_channel.basic_nack.assert_awaited_once_with(2, multiple=True, requeue=True)
+
+
+async def ack(channel, msg):
+    await channel.basic_ack(msg.delivery.delivery_tag)
+
+
+class TestAckCoalescing:
+    @pytest.mark.parametrize("kwds", [{"interval": 0}, {"threshold": 0}])
+    def test_invalid(self, kwds):
+        with pytest.raises(ValueError):
+            AckCoalescing(**kwds)
+
+    def test_auto_ack(self):
+        with pytest.raises(ValueError, match="ack_coalescing requires auto_ack=False"):
+            ConsumerSpec(queue="queue", callback=ack, ack_coalescing=AckCoalescing())
+
+    @pytest.mark.asyncio
+    async def test_threshold(self, ops, mock_channel):
+        spec = ConsumerSpec(queue="queue", callback=ack, auto_ack=False, ack_coalescing=AckCoalescing(60, 10))
+        consumer = await ops.consume(spec)
+        for tag in range(1, 26):
+            await on_message(mock_channel)(message(tag))
+        assert [call.args for call in mock_channel.basic_ack.await_args_list] == [(10,), (20,)]
+        assert consumer._acks.pending == 5
+        await ops.stop_consume()
+        mock_channel.basic_ack.assert_awaited_with(25, multiple=True)
+        assert consumer._acks.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_out_of_order(self, ops, mock_channel):
+        release = asyncio.Event()
+
+        async def callback(channel, msg):
+            tag = msg.delivery.delivery_tag
+            if tag == 2:
+                await release.wait()
+            if tag == 4:
+                await channel.basic_nack(tag, requeue=False)
+            else:
+                await channel.basic_ack(tag)
+
+        spec = ConsumerSpec(queue="queue", callback=callback, auto_ack=False, ack_coalescing=AckCoalescing(60, 3))
+        consumer = await ops.consume(spec)
+        tasks = [asyncio.create_task(on_message(mock_channel)(message(tag))) for tag in range(1, 7)]
+        await asyncio.sleep(0)
+        # 1 acked, 2 in progress, 3 and 5 acked, 4 nacked at once
+        mock_channel.basic_nack.assert_awaited_once_with(4, multiple=False, requeue=False)
+        mock_channel.basic_ack.assert_awaited_once_with(1, multiple=True)
+        assert consumer._acks.pending == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+        mock_channel.basic_ack.assert_awaited_with(6, multiple=True)
+        assert consumer._acks.pending == 0
+        assert list(consumer._acks._delivered) == []
+
+    @pytest.mark.asyncio
+    async def test_timer(self, ops, mock_channel):
+        release = asyncio.Event()
+
+        async def callback(channel, msg):
+            if msg.delivery.delivery_tag == 1:
+                await release.wait()
+            await channel.basic_ack(msg.delivery.delivery_tag)
+
+        spec = ConsumerSpec(queue="queue", callback=callback, auto_ack=False, ack_coalescing=AckCoalescing(0.01))
+        consumer = await ops.consume(spec)
+        task = asyncio.create_task(on_message(mock_channel)(message(1)))
+        for tag in (2, 3):
+            await on_message(mock_channel)(message(tag))
+        await asyncio.sleep(0.05)
+        # acks behind the delivery in progress are held back
+        mock_channel.basic_ack.assert_not_awaited()
+        assert consumer._acks.pending == 2
+        release.set()
+        await task
+        await asyncio.sleep(0.05)
+        mock_channel.basic_ack.assert_awaited_once_with(3, multiple=True)
+        assert consumer._acks.pending == 0
+        assert list(consumer._acks._delivered) == []
+
+    @pytest.mark.asyncio
+    async def test_stop_in_progress(self, ops, mock_channel):
+        release = asyncio.Event()
+
+        async def callback(channel, msg):
+            if msg.delivery.delivery_tag == 2:
+                await release.wait()
+            await channel.basic_ack(msg.delivery.delivery_tag)
+
+        spec = ConsumerSpec(queue="queue", callback=callback, auto_ack=False, ack_coalescing=AckCoalescing(60))
+        consumer = await ops.consume(spec)
+        await on_message(mock_channel)(message(1))
+        task = asyncio.create_task(on_message(mock_channel)(message(2)))
+        for tag in (3, 4):
+            await on_message(mock_channel)(message(tag))
+        await ops.stop_consume()
+        # on stop the acks behind the delivery in progress are sent one by one
+        assert [call.args for call in mock_channel.basic_ack.await_args_list] == [(1,), (3,), (4,)]
+        release.set()
+        await task
+        await consumer._acks.flush()
+        mock_channel.basic_ack.assert_awaited_with(2, multiple=True)
+        assert consumer._acks.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_stop_waits_for_workers(self, ops, mock_channel):
+        async def callback(channel, msg):
+            await asyncio.sleep(0.01)
+            await channel.basic_ack(msg.delivery.delivery_tag)
+
+        spec = ConsumerSpec(
+            queue="queue",
+            callback=callback,
+            auto_ack=False,
+            concurrency=2,
+            ack_coalescing=AckCoalescing(60),
+        )
+        consumer = await ops.consume(spec)
+        for tag in range(1, 5):
+            await on_message(mock_channel)(message(tag))
+        await ops.stop_consume()
+        # the final flush runs after the workers handled the pending messages
+        mock_channel.basic_ack.assert_awaited_once_with(4, multiple=True)
+        assert consumer._acks.pending == 0
+        assert list(consumer._acks._delivered) == []
+
+    @pytest.mark.asyncio
+    async def test_on_error(self, ops, mock_channel):
+        async def callback(channel, msg):
+            if msg.delivery.delivery_tag == 2:
+                raise RuntimeError
+            await channel.basic_ack(msg.delivery.delivery_tag)
+
+        spec = ConsumerSpec(
+            queue="queue",
+            callback=callback,
+            auto_ack=False,
+            on_error="requeue",
+            ack_coalescing=AckCoalescing(60, 3),
+        )
+        await ops.consume(spec)
+        for tag in range(1, 5):
+            await on_message(mock_channel)(message(tag))
+        mock_channel.basic_reject.assert_awaited_once_with(2, requeue=True)
+        mock_channel.basic_ack.assert_awaited_once_with(4, multiple=True)
+
+
+class TestAdaptivePrefetch:
+    @pytest.mark.parametrize(
+        "kwds", [{"min_prefetch": 0}, {"min_prefetch": 10, "max_prefetch": 5}, {"buffered": -1}, {"interval": 0}]
+    )
+    def test_invalid(self, kwds):
+        with pytest.raises(ValueError):
+            AdaptivePrefetch(**kwds)
+
+    def test_auto_ack(self):
+        with pytest.raises(ValueError, match="adaptive_prefetch requires auto_ack=False"):
+            ConsumerSpec(queue="queue", callback=ack, adaptive_prefetch=AdaptivePrefetch())
+
+    @pytest.mark.asyncio
+    async def test_target(self, ops, mock_channel):
+        spec = ConsumerSpec(
+            queue="queue",
+            callback=ack,
+            auto_ack=False,
+            concurrency=4,
+            adaptive_prefetch=AdaptivePrefetch(max_prefetch=100, interval=60),
+        )
+        consumer = await ops.consume(spec)
+        tuner = consumer._tuner
+        assert consumer.prefetch_count == 4
+        mock_channel.basic_qos.assert_awaited_once_with(prefetch_count=4, prefetch_size=None, timeout=None)
+        assert tuner.target() is None
+        assert tuner.rtt is not None
+
+        tuner._rtt = 0.01
+        tuner._service_time = 0.005
+        # 4 workers * (1 handled + 1 buffered + 2 in flight)
+        assert tuner.target() == 16
+        tuner._service_time = 0.00001
+        assert tuner.target() == 100
+        await ops.stop_consume()
+
+    @pytest.mark.asyncio
+    async def test_adjust(self, ops, mock_channel):
+        async def callback(channel, msg):
+            await asyncio.sleep(0.005)
+            await channel.basic_ack(msg.delivery.delivery_tag)
+
+        async def basic_qos(**kwds):
+            await asyncio.sleep(0.02)
+
+        mock_channel.basic_qos = AsyncMock(side_effect=basic_qos)
+        spec = ConsumerSpec(
+            queue="queue",
+            callback=callback,
+            auto_ack=False,
+            prefetch_count=1,
+            adaptive_prefetch=AdaptivePrefetch(interval=0.01),
+        )
+        consumer = await ops.consume(spec, restore=True)
+        await on_message(mock_channel)(message(1))
+        assert consumer._tuner.service_time >= 0.005
+        await asyncio.sleep(0.1)
+        assert consumer.prefetch_count > 2
+        assert mock_channel.basic_qos.await_args.kwargs["prefetch_count"] == consumer.prefetch_count
+
+        # a restored consumer starts from the adjusted prefetch count
+        prefetch_count = consumer.prefetch_count
+        mock_channel.basic_qos.reset_mock()
+        await ops._on_connection_state_changed(ConnectionState.RECONNECTING, ConnectionState.CONNECTED)
+        await ops._restore_task
+        consumer._tuner.stop()
+        mock_channel.basic_qos.assert_awaited_once_with(prefetch_count=prefetch_count, prefetch_size=None, timeout=None)
+        assert ops.consumers[0].prefetch_count == prefetch_count
+
+        await ops.stop_consume()
+        assert ops._prefetch_counts == {}
+
+    @pytest.mark.asyncio
+    async def test_adjust_error(self, ops, mock_channel):
+        spec = ConsumerSpec(
+            queue="queue",
+            callback=ack,
+            auto_ack=False,
+            prefetch_count=1,
+            adaptive_prefetch=AdaptivePrefetch(interval=0.01),
+        )
+        consumer = await ops.consume(spec)
+        mock_channel.basic_qos = AsyncMock(side_effect=[aiormq.exceptions.ChannelInvalidStateError, None])
+        consumer._tuner._service_time = 0.001
+        consumer._tuner._rtt = 0.001
+        await asyncio.sleep(0.05)
+        # the failed adjustment is retried on the next interval
+        assert mock_channel.basic_qos.await_count == 2
+        assert consumer.prefetch_count == mock_channel.basic_qos.await_args.kwargs["prefetch_count"]
+        assert not consumer._tuner._task.done()
+        await ops.stop_consume()
+
+    @pytest.mark.asyncio
+    async def test_prefetch_count(self, ops):
+        consumer = await ops.consume(ConsumerSpec(queue="queue", callback=ack, auto_ack=False, prefetch_count=7))
+        assert consumer.prefetch_count == 7
+
+
+@pytest.fixture
+def queue(ops):
+    return Queue(QueueSpec(name="queue"), ops)
+
+
+def delivery(mock_channel, delivery_tag):
+    return replace(message(delivery_tag), channel=mock_channel)
+
+
+class TestMessageIterator:
+    @pytest.mark.parametrize("kwds", [{"prefetch": 0}, {"buffer": 0}])
+    def test_invalid(self, queue, kwds):
+        with pytest.raises(ValueError):
+            queue.iter_messages(**kwds)
+
+    @pytest.mark.asyncio
+    async def test_iterate(self, queue, ops, mock_channel):
+        messages = queue.iter_messages(prefetch=10)
+        assert isinstance(messages, MessageIterator)
+        assert messages.consumer is None
+
+        async def deliver():
+            await asyncio.sleep(0.01)
+            for tag in range(1, 4):
+                await on_message(mock_channel)(delivery(mock_channel, tag))
+
+        task = asyncio.create_task(deliver())
+        received = []
+        async for msg in messages:
+            received.append(msg.delivery.delivery_tag)
+            if len(received) == 3:
+                await messages.close()
+        await task
+        assert received == [1, 2, 3]
+        mock_channel.basic_qos.assert_awaited_once_with(prefetch_count=10, prefetch_size=None, timeout=None)
+        assert mock_channel.basic_consume.call_args.kwargs["no_ack"] is False
+        mock_channel.basic_cancel.assert_awaited_once_with("test_tag", timeout=None)
+        assert ops.consumers == []
+
+    @pytest.mark.asyncio
+    async def test_flow_control(self, queue, mock_channel):
+        async with queue.iter_messages(prefetch=10, buffer=2) as messages:
+            deliveries = [
+                asyncio.create_task(on_message(mock_channel)(delivery(mock_channel, tag))) for tag in range(1, 5)
+            ]
+            await asyncio.sleep(0.01)
+            assert messages.buffered == 2
+            assert [task.done() for task in deliveries] == [True, True, False, False]
+
+            assert (await anext(messages)).delivery.delivery_tag == 1
+            await asyncio.sleep(0.01)
+            assert deliveries[2].done()
+            assert not deliveries[3].done()
+        deliveries[3].cancel()
+
+    @pytest.mark.asyncio
+    async def test_stop_consume(self, queue, ops, mock_channel):
+        async with queue.iter_messages() as messages:
+            await on_message(mock_channel)(delivery(mock_channel, 1))
+            await ops.stop_consume()
+            assert messages.buffered == 1
+            # buffered messages are still taken
+            assert [msg.delivery.delivery_tag async for msg in messages] == [1]
+            assert messages.buffered == 0
+
+            # late deliveries are requeued
+            await on_message(mock_channel)(delivery(mock_channel, 2))
+            mock_channel.basic_nack.assert_awaited_once_with(2, requeue=True)
+
+    @pytest.mark.asyncio
+    async def test_restore(self, queue, ops, mock_channel):
+        async with queue.iter_messages() as messages:
+            stale = message(1)
+            stale.channel.is_closed = True
+            await on_message(mock_channel)(stale)
+
+            await ops._on_connection_state_changed(ConnectionState.RECONNECTING, ConnectionState.CONNECTED)
+            await ops._restore_task
+            assert mock_channel.basic_consume.await_count == 2
+            consumer = messages.consumer
+            assert consumer is ops.consumers[0]
+
+            fresh = delivery(mock_channel, 1)
+            await on_message(mock_channel)(fresh)
+            assert await anext(messages) is fresh
+        assert ops.consumers == []
+
+
+class TestOrderedDispatch:
+    @pytest.mark.parametrize(
+        "kwds, error",
+        [
+            ({"lanes": 0}, "lanes must be positive"),
+            ({"lane_size": 0}, "lane_size must be positive"),
+            ({"header": "user", "key": str}, "header and key are mutually exclusive"),
+        ],
+    )
+    def test_invalid(self, kwds, error):
+        with pytest.raises(ValueError, match=error):
+            OrderedDispatch(**kwds)
+
+    def test_concurrency(self):
+        with pytest.raises(ValueError, match="ordered and concurrency are mutually exclusive"):
+            ConsumerSpec(queue="queue", callback=ack, auto_ack=False, concurrency=2, ordered=OrderedDispatch())
+
+    def test_key(self):
+        msg = message(1, routing_key="user.1")
+        msg.header.properties.headers = {"user": 7}
+        assert OrderedDispatch().get_key(msg) == "user.1"
+        assert OrderedDispatch(header="user").get_key(msg) == 7
+        assert OrderedDispatch(header="other").get_key(msg) is None
+        assert OrderedDispatch(key=lambda msg: msg.body).get_key(msg) == b"data"
+
+    def test_unhashable_header(self):
+        msg = message(1)
+        msg.header.properties.headers = {"user": {"id": 7}, "tags": [1, 2], "raw": bytearray(b"7")}
+        assert OrderedDispatch(header="user").get_key(msg) == repr({"id": 7})
+        assert OrderedDispatch(header="tags").get_key(msg) == "[1, 2]"
+        assert OrderedDispatch(header="raw").get_key(msg) == b"7"
+
+    @pytest.mark.asyncio
+    async def test_key_error(self, ops, mock_channel):
+        spec = ConsumerSpec(
+            queue="queue",
+            callback=ack,
+            auto_ack=False,
+            ordered=OrderedDispatch(lanes=4, key=lambda msg: [msg.delivery.delivery_tag]),
+        )
+        consumer = await ops.consume(spec)
+        await on_message(mock_channel)(message(1))
+        await ops.stop_consume()
+        await asyncio.gather(*consumer._workers._tasks)
+        # an unhashable key falls back to the first lane, and the message is still settled
+        mock_channel.basic_ack.assert_awaited_once_with(1)
+
+    @pytest.mark.asyncio
+    async def test_order(self, ops, mock_channel):
+        handled = []
+
+        async def callback(channel, msg):
+            await asyncio.sleep(0.001 * (msg.delivery.delivery_tag % 3))
+            handled.append((msg.delivery.routing_key, msg.delivery.delivery_tag))
+            await channel.basic_ack(msg.delivery.delivery_tag)
+
+        spec = ConsumerSpec(queue="queue", callback=callback, auto_ack=False, ordered=OrderedDispatch(lanes=4))
+        consumer = await ops.consume(spec)
+        mock_channel.basic_qos.assert_awaited_once_with(prefetch_count=400, prefetch_size=None, timeout=None)
+        assert mock_channel.create_task.call_count == 4
+
+        for tag in range(1, 31):
+            await on_message(mock_channel)(message(tag, routing_key=f"user.{tag % 5}"))
+        await ops.stop_consume()
+        await asyncio.gather(*consumer._workers._tasks)
+        assert len(handled) == 30
+        for key in {key for key, _ in handled}:
+            tags = [tag for key_, tag in handled if key_ == key]
+            assert tags == sorted(tags)
+        assert mock_channel.basic_ack.await_count == 30
+
+    @pytest.mark.asyncio
+    async def test_parallel(self, ops, mock_channel):
+        running = set()
+        release = asyncio.Event()
+
+        async def callback(channel, msg):
+            running.add(msg.delivery.routing_key)
+            await release.wait()
+
+        spec = ConsumerSpec(
+            queue="queue",
+            callback=callback,
+            auto_ack=False,
+            ordered=OrderedDispatch(lanes=2, key=lambda msg: msg.delivery.delivery_tag),
+        )
+        consumer = await ops.consume(spec)
+        for tag in range(1, 5):
+            await on_message(mock_channel)(message(tag, routing_key=str(tag)))
+        await asyncio.sleep(0.01)
+        # one message per lane at a time
+        assert len(running) == 2
+        assert consumer._workers.pending == 2
+        release.set()
+        await ops.stop_consume()
+        await asyncio.gather(*consumer._workers._tasks)
+        assert running == {"1", "2", "3", "4"}
+
+    @pytest.mark.asyncio
+    async def test_lane_size(self, ops, mock_channel):
+        handled = []
+        release = asyncio.Event()
+
+        async def callback(channel, msg):
+            await release.wait()
+            handled.append(msg.delivery.delivery_tag)
+
+        spec = ConsumerSpec(queue="queue", callback=callback, ordered=OrderedDispatch(lanes=1, lane_size=2))
+        consumer = await ops.consume(spec)
+        mock_channel.basic_qos.assert_awaited_once_with(prefetch_count=2, prefetch_size=None, timeout=None)
+        deliveries = []
+        for tag in range(1, 7):
+            deliveries.append(asyncio.create_task(on_message(mock_channel)(message(tag))))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        # one message handled, two waiting in the lane, the rest waiting for space
+        assert consumer._workers.pending == 2
+        assert [task.done() for task in deliveries] == [True, True, True, False, False, False]
+
+        release.set()
+        await asyncio.gather(*deliveries)
+        await ops.stop_consume()
+        await asyncio.gather(*consumer._workers._tasks)
+        assert handled == [1, 2, 3, 4, 5, 6]
+
+    @pytest.mark.asyncio
+    async def test_on_error(self, ops, mock_channel):
+        async def callback(channel, msg):
+            raise RuntimeError
+
+        spec = ConsumerSpec(
+            queue="queue", callback=callback, auto_ack=False, on_error="reject", ordered=OrderedDispatch(lanes=2)
+        )
+        consumer = await ops.consume(spec)
+        await on_message(mock_channel)(message(1))
+        await ops.stop_consume()
+        await asyncio.gather(*consumer._workers._tasks)
+        mock_channel.basic_reject.assert_awaited_once_with(1, requeue=False)
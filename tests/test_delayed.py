@@ -0,0 +1,139 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from rmqaio import BindSpec, DelayedExchangeSpec, DelayLadder, Exchange, ExchangeSpec, Ops
+
+
+def selected(ladder: DelayLadder, delay):
+    headers = ladder.headers("target", delay)
+    return [bucket for level, bucket in enumerate(ladder.buckets) if headers[f"rmqaio.delay.L{level}"] == "1"]
+
+
+class TestDelayLadder:
+    def test_buckets(self):
+        ladder = DelayLadder(buckets=(1, 600, 10, 60, 10))
+        assert ladder.buckets == (600, 60, 10, 1)
+        assert ladder.max_delay == 671
+        assert ladder.exchange == "rmqaio.delay.L0"
+        assert DelayLadder().max_delay == 2**20 - 1
+
+    @pytest.mark.parametrize("buckets", [(), (0, 1), (-1,)])
+    def test_invalid(self, buckets):
+        with pytest.raises(ValueError, match="delay buckets must be positive"):
+            DelayLadder(buckets=buckets)
+
+    def test_headers(self):
+        ladder = DelayLadder()
+        assert selected(ladder, 0) == []
+        assert selected(ladder, 0.4) == []
+        assert selected(ladder, 0.6) == [1]
+        assert selected(ladder, 90) == [64, 16, 8, 2]
+        assert selected(ladder, 3600) == [2048, 1024, 512, 16]
+        assert ladder.headers("target", 1)["rmqaio.delay.exchange"] == "target"
+
+        ladder = DelayLadder(buckets=(1, 10, 60, 600))
+        assert selected(ladder, 71) == [60, 10, 1]
+        with pytest.raises(ValueError, match="delay exceeds maximum delay 671"):
+            ladder.headers("target", 672)
+
+    @pytest.mark.parametrize("delay", [30, 45, 125, 300])
+    def test_headers_not_a_sum(self, delay):
+        ladder = DelayLadder(buckets=(1, 10, 60, 600))
+        with pytest.raises(ValueError, match=f"delay {delay} is not a sum of delay buckets"):
+            ladder.headers("target", delay)
+
+    def test_topology(self):
+        topology = DelayLadder(buckets=(1, 10)).topology("target")
+        assert [spec.name for spec in topology.exchanges] == [
+            "rmqaio.delay.L0",
+            "rmqaio.delay.L1",
+            "rmqaio.delay.deliver",
+        ]
+        assert all(spec.type == "headers" for spec in topology.exchanges)
+        assert [
+            (spec.name, spec.arguments.message_ttl, spec.arguments.dead_letter_exchange) for spec in topology.queues
+        ] == [
+            ("rmqaio.delay.L0", 10000, "rmqaio.delay.L1"),
+            ("rmqaio.delay.L1", 1000, "rmqaio.delay.deliver"),
+        ]
+        assert list(topology.bindings) == [
+            BindSpec("rmqaio.delay.L0", "rmqaio.delay.L0", "", arguments={"x-match": "all", "rmqaio.delay.L0": "1"}),
+            BindSpec(
+                "rmqaio.delay.L0",
+                "rmqaio.delay.L1",
+                "",
+                kind="exchange",
+                arguments={"x-match": "all", "rmqaio.delay.L0": "0"},
+            ),
+            BindSpec("rmqaio.delay.L1", "rmqaio.delay.L1", "", arguments={"x-match": "all", "rmqaio.delay.L1": "1"}),
+            BindSpec(
+                "rmqaio.delay.L1",
+                "rmqaio.delay.deliver",
+                "",
+                kind="exchange",
+                arguments={"x-match": "all", "rmqaio.delay.L1": "0"},
+            ),
+            BindSpec(
+                "rmqaio.delay.deliver",
+                "target",
+                "",
+                kind="exchange",
+                arguments={"x-match": "all", "rmqaio.delay.exchange": "target"},
+            ),
+        ]
+
+
+class TestPublishDelayed:
+    @pytest.mark.asyncio
+    async def test_delayed_exchange(self):
+        exchange = Exchange(DelayedExchangeSpec(name="delayed"), AsyncMock())
+        await exchange.publish_delayed(b"data", "key", 1.5, properties={"headers": {"a": 1}})
+        exchange.ops.delay_ladder_declare.assert_not_awaited()
+        call = exchange.ops.publish.call_args
+        assert call.args[:3] == ("delayed", b"data", "key")
+        assert call.kwargs["properties"] == {"headers": {"a": 1, "x-delay": 1500}}
+
+    @pytest.mark.asyncio
+    async def test_ladder(self):
+        ladder = DelayLadder(buckets=(1, 10))
+        exchange = Exchange(ExchangeSpec(name="target"), AsyncMock(), delay_ladder=ladder)
+        await exchange.publish_delayed(b"data", "key", 11)
+        exchange.ops.delay_ladder_declare.assert_awaited_once_with(ladder, "target", timeout=None, restore=True)
+        call = exchange.ops.publish.call_args
+        assert call.args[:3] == ("rmqaio.delay.L0", b"data", "key")
+        assert call.kwargs["properties"]["headers"] == {
+            "rmqaio.delay.exchange": "target",
+            "rmqaio.delay.L0": "1",
+            "rmqaio.delay.L1": "1",
+        }
+
+    @pytest.mark.asyncio
+    async def test_invalid_delay(self):
+        exchange = Exchange(ExchangeSpec(name="target"), AsyncMock())
+        with pytest.raises(ValueError, match="delay must not be negative"):
+            await exchange.publish_delayed(b"data", "key", -1)
+        exchange.ops.publish.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_declare(self, mock_conn, mock_channel):
+        ops = Ops(mock_conn)
+        ladder = DelayLadder(buckets=(1, 10))
+        await ops.delay_ladder_declare(ladder, "target", restore=True)
+        await ops.delay_ladder_declare(ladder, "target", restore=True)
+        assert mock_channel.exchange_declare.await_count == 3
+        assert mock_channel.queue_declare.await_count == 2
+        assert mock_channel.queue_bind.await_count == 2
+        assert mock_channel.exchange_bind.await_count == 3
+        mock_channel.exchange_bind.assert_awaited_with(
+            "target",
+            "rmqaio.delay.deliver",
+            routing_key="",
+            arguments={"x-match": "all", "rmqaio.delay.exchange": "target"},
+            timeout=None,
+        )
+        assert [spec.name for spec in ops._topology.queues] == ["rmqaio.delay.L0", "rmqaio.delay.L1"]
+        assert len(ops._topology.bindings) == 5
+
+        await ops.delay_ladder_declare(ladder, "other")
+        assert mock_channel.exchange_bind.await_count == 6
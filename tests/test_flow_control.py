@@ -0,0 +1,198 @@
+import asyncio
+
+import aiormq
+import pytest
+
+from unittest.mock import AsyncMock, MagicMock
+
+from yarl import URL
+
+from rmqaio import Connection, ConnectionPool, FlowState, Ops
+from rmqaio.rmqaio import _HAS_TRANSPORT_FACTORY, _FlowTransportFactory
+
+
+def block(conn: Connection, reason="low on memory"):
+    return conn._conn._Connection__handle_connection_blocked(aiormq.spec.Connection.Blocked(reason=reason))
+
+
+def unblock(conn: Connection):
+    return conn._conn._Connection__handle_connection_unblocked(aiormq.spec.Connection.Unblocked())
+
+
+@pytest.fixture
+async def conn():
+    conn = Connection("amqp://admin@example.com")
+    # an unconnected aiormq connection provides the real blocked/unblocked handlers
+    conn._conn = aiormq.Connection("amqp://admin@example.com")
+    conn._watch_blocked(conn._conn)
+    return conn
+
+
+class TestFlowState:
+    def test_invalid_write_buffer_limits(self):
+        with pytest.raises(ValueError, match="write buffer limits must satisfy 0 <= low <= high"):
+            Connection("amqp://admin@example.com", write_buffer_limits=(1024, 4096))
+
+    @pytest.mark.asyncio
+    async def test_blocked(self, conn):
+        assert conn.flow_state == FlowState.FLOWING
+        await block(conn)
+        assert conn.flow_state == FlowState.BLOCKED
+        await unblock(conn)
+        assert conn.flow_state == FlowState.FLOWING
+
+    @pytest.mark.asyncio
+    async def test_stale_connection(self, conn):
+        stale = conn._conn
+        conn._conn = aiormq.Connection("amqp://admin@example.com")
+        await stale._Connection__handle_connection_blocked(aiormq.spec.Connection.Blocked(reason="disk"))
+        assert conn.flow_state == FlowState.FLOWING
+
+    @pytest.mark.asyncio
+    async def test_blocked_while_connecting(self, mock_aiormq):
+        make_conn = mock_aiormq.side_effect
+
+        def connection(*args, **kwargs):
+            aiormq_conn = make_conn(*args, **kwargs)
+            aiormq_conn._Connection__handle_connection_blocked = AsyncMock()
+
+            async def connect():
+                # the broker blocks the connection before the handshake completes
+                frame = aiormq.spec.Connection.Blocked(reason="low on memory")
+                await aiormq_conn._Connection__handle_connection_blocked(frame)
+
+            aiormq_conn.connect = AsyncMock(side_effect=connect)
+            return aiormq_conn
+
+        mock_aiormq.side_effect = connection
+        conn = Connection("amqp://admin@example.com")
+        await conn.open()
+        assert conn.flow_state == FlowState.BLOCKED
+        await conn.close()
+
+    @pytest.mark.asyncio
+    async def test_watch_blocked_without_handlers(self, caplog):
+        conn = Connection("amqp://admin@example.com")
+        aiormq_conn = MagicMock(spec=[])
+        conn._watch_blocked(aiormq_conn)
+        assert "can not watch connection.blocked" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_throttled(self, conn):
+        factory = conn._transport_factory = _FlowTransportFactory(conn.url, None, conn._on_transport_writing)
+        conn._on_transport_writing(factory, False)
+        assert conn.flow_state == FlowState.THROTTLED
+        await block(conn)
+        assert conn.flow_state == FlowState.BLOCKED
+        await unblock(conn)
+        assert conn.flow_state == FlowState.THROTTLED
+        conn._on_transport_writing(_FlowTransportFactory(conn.url, None, conn._on_transport_writing), True)
+        assert conn.flow_state == FlowState.THROTTLED
+        conn._on_transport_writing(factory, True)
+        assert conn.flow_state == FlowState.FLOWING
+
+    @pytest.mark.asyncio
+    async def test_wait_writable(self, conn):
+        await conn.wait_writable(timeout=0)
+        await block(conn)
+        with pytest.raises(asyncio.TimeoutError):
+            await conn.wait_writable(timeout=0.01)
+        waiter = asyncio.create_task(conn.wait_writable())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        await unblock(conn)
+        await asyncio.wait_for(waiter, timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_callback(self, conn):
+        changes = []
+
+        async def callback(state_from, state_to):
+            changes.append((state_from, state_to))
+
+        conn.set_flow_callback("test", callback)
+        await block(conn)
+        await unblock(conn)
+        await asyncio.sleep(0)
+        assert changes == [(FlowState.FLOWING, FlowState.BLOCKED), (FlowState.BLOCKED, FlowState.FLOWING)]
+        await conn.remove_flow_callback("test")
+        await block(conn)
+        await asyncio.sleep(0)
+        assert len(changes) == 2
+
+
+@pytest.mark.skipif(not _HAS_TRANSPORT_FACTORY, reason="transport factories require aiormq 7")
+class TestFlowTransportFactory:
+    @pytest.mark.asyncio
+    async def test_create(self):
+        server = await asyncio.start_server(lambda reader, writer: None, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        events = []
+        factory = _FlowTransportFactory(
+            "amqp://127.0.0.1",
+            (4096, 1024),
+            lambda factory_, writing: events.append((factory_, writing)),
+        )
+        async with server:
+            _, writer = await factory.create(URL(f"amqp://127.0.0.1:{port}"))
+            assert writer.transport.get_write_buffer_limits() == (1024, 4096)
+            protocol = writer.transport.get_protocol()
+            protocol.pause_writing()
+            protocol.resume_writing()
+            assert events == [(factory, False), (factory, True)]
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+
+
+class TestPublishBackpressure:
+    @pytest.mark.asyncio
+    async def test_publish_waits(self, mock_aiormq):
+        conn = Connection("amqp://admin@example.com")
+        await conn.open()
+        async with conn.acquire_channel() as channel:
+            pass
+        conn._blocked = True
+        conn._update_flow_state()
+
+        ops = Ops(conn)
+        publish = asyncio.create_task(ops.publish("exchange", b"data", "key"))
+        await asyncio.sleep(0.01)
+        assert not publish.done()
+        channel.basic_publish.assert_not_awaited()
+
+        conn._blocked = False
+        conn._update_flow_state()
+        await asyncio.wait_for(publish, timeout=1)
+        channel.basic_publish.assert_awaited_once()
+        await conn.close()
+
+    @pytest.mark.asyncio
+    async def test_publish_timeout(self, mock_aiormq):
+        conn = Connection("amqp://admin@example.com")
+        await conn.open()
+        conn._throttled = True
+        conn._update_flow_state()
+        with pytest.raises(asyncio.TimeoutError):
+            await Ops(conn, timeout=0.01).publish_many("exchange", [("key", b"data", None)])
+        await conn.close()
+        assert conn.flow_state == FlowState.FLOWING
+
+    @pytest.mark.asyncio
+    async def test_pool(self, mock_aiormq):
+        pool = ConnectionPool("amqp://admin@example.com", size=2, strategy="hash")
+        await pool.open()
+        assert pool.flow_state == FlowState.FLOWING
+        member = pool.connections[1]
+        member._throttled = True
+        member._update_flow_state()
+        assert pool.flow_state == FlowState.THROTTLED
+        throttled_key = next(key for key in range(100) if pool.pick(key) is member)
+        flowing_key = next(key for key in range(100) if pool.pick(key) is not member)
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.wait_writable(timeout=0.01, key=throttled_key)
+        await pool.wait_writable(timeout=0.01, key=flowing_key)
+        member._throttled = False
+        member._update_flow_state()
+        await pool.wait_writable(timeout=1, key=throttled_key)
+        await pool.close()
@@ -1,9 +1,27 @@
+import asyncio
+import uuid
+
+from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock
 
 import aiormq
 import pytest
 
-from rmqaio import BindSpec, ConnectionState, ConsumerSpec, ExchangeSpec, Ops, QueueSpec, Topology
+from pamqp.header import ContentHeader
+
+from rmqaio import (
+    BasicProperties,
+    BindSpec,
+    Config,
+    ConnectionState,
+    ConsumerSpec,
+    ExchangeSpec,
+    MessageTemplate,
+    Ops,
+    PublishOutcome,
+    QueueSpec,
+    Topology,
+)
 from rmqaio.rmqaio import OperationError
 
 
@@ -328,6 +346,250 @@ class TestOpsPublish:
         await ops.publish("test_exchange", b"test_data", "test.key", properties=properties)
         mock_channel.basic_publish.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_publish_no_wait(self, ops, mock_channel):
+        confirmation = asyncio.get_running_loop().create_future()
+
+        async def basic_publish(*args, **kwds):
+            return await confirmation
+
+        mock_channel.basic_publish = AsyncMock(side_effect=basic_publish)
+        future = await ops.publish("test_exchange", b"test_data", "test.key", wait=False)
+        assert not future.done()
+        confirmation.set_result("ack")
+        assert await future == "ack"
+
+    @pytest.mark.asyncio
+    async def test_publish_window(self, mock_conn, mock_channel):
+        ops = Ops(mock_conn, publish_window=2)
+        confirmations = [asyncio.get_running_loop().create_future() for _ in range(3)]
+        pending = iter(confirmations)
+
+        async def basic_publish(*args, **kwds):
+            return await next(pending)
+
+        mock_channel.basic_publish = AsyncMock(side_effect=basic_publish)
+        futures = [await ops.publish("test_exchange", b"test_data", "test.key", wait=False) for _ in range(2)]
+
+        third = asyncio.create_task(ops.publish("test_exchange", b"test_data", "test.key", wait=False))
+        await asyncio.sleep(0.01)
+        assert not third.done()
+
+        confirmations[0].set_result("ack")
+        await futures[0]
+        confirmations[2].set_result("ack")
+        assert await (await third) == "ack"
+        confirmations[1].set_result("ack")
+        await futures[1]
+
+    @pytest.mark.asyncio
+    async def test_publish_no_confirm(self, ops, mock_conn, mock_channel):
+        result = await ops.publish("test_exchange", b"test_data", "test.key", wait=False, confirm=False)
+        assert result is None
+        mock_conn.channel.assert_not_called()
+        mock_conn.new_channel.assert_called_once_with(timeout=30, publisher_confirms=False)
+        mock_channel.basic_publish.assert_called_once()
+
+        await ops.publish("test_exchange", b"test_data", "test.key", confirm=False)
+        mock_conn.new_channel.assert_called_once()
+
+    def test_publish_window_invalid(self, mock_conn):
+        with pytest.raises(ValueError, match="publish_window must be positive"):
+            Ops(mock_conn, publish_window=0)
+
+    @pytest.mark.asyncio
+    async def test_publish_template(self, ops, mock_channel):
+        template = MessageTemplate(content_type="application/json", headers={"version": 1})
+        await ops.publish("test_exchange", b"1", "test.key", properties=template)
+        await ops.publish("test_exchange", b"2", "test.key", properties=template)
+        first, second = [call.kwargs["properties"] for call in mock_channel.basic_publish.call_args_list]
+        assert first is not second
+        assert first == second == template.properties
+
+
+class TestMessageTemplate:
+    def test_build(self):
+        template = MessageTemplate(content_type="application/json", delivery_mode=2, headers={"a": "b"})
+        timestamp = datetime(2024, 1, 1)
+        properties = template.build(message_id="1", timestamp=timestamp, correlation_id="2")
+        expected = BasicProperties(
+            content_type="application/json",
+            delivery_mode=2,
+            headers={"a": "b"},
+            message_id="1",
+            timestamp=timestamp,
+            correlation_id="2",
+        )
+        assert properties == expected
+        assert properties.marshal() == expected.marshal()
+        assert template.properties.message_id is None
+
+    def test_marshal_reads_current_values(self):
+        template = MessageTemplate(app_id="app", message_id="template")
+        properties = template.build()
+        assert properties.message_id == "template"
+        properties.message_id = "changed"
+        assert properties.marshal() == BasicProperties(app_id="app", message_id="changed").marshal()
+
+    def test_build_copies_headers(self):
+        template = MessageTemplate(app_id="app", headers={"a": "b"})
+        properties = template.build()
+        properties.headers["c"] = "d"
+        assert template.properties.headers == {"a": "b"}
+        assert properties.marshal() == BasicProperties(app_id="app", headers={"a": "b", "c": "d"}).marshal()
+        assert template.build().marshal() == BasicProperties(app_id="app", headers={"a": "b"}).marshal()
+
+    def test_invalid(self):
+        with pytest.raises(TypeError):
+            MessageTemplate(unknown=1)
+
+
+class TestOpsPublishMany:
+    @pytest.mark.asyncio
+    async def test_publish_many(self, ops, mock_channel):
+        message = MagicMock(delivery=aiormq.spec.Basic.Return())
+        mock_channel.basic_publish = AsyncMock(
+            side_effect=[
+                aiormq.spec.Basic.Ack(delivery_tag=1),
+                aiormq.exceptions.DeliveryError(None, aiormq.spec.Basic.Nack(delivery_tag=2)),
+                aiormq.exceptions.PublishError(message, aiormq.spec.Basic.Return()),
+            ]
+        )
+        properties = BasicProperties(content_type="text/plain")
+        outcomes = await ops.publish_many(
+            "test_exchange",
+            [("a", b"1", None), ("b", b"2", {"content_type": "application/json"}), ("c", b"3", properties)],
+            mandatory=True,
+        )
+        assert outcomes == [PublishOutcome.ACKED, PublishOutcome.NACKED, PublishOutcome.RETURNED]
+        assert mock_channel.basic_publish.call_count == 3
+        calls = mock_channel.basic_publish.call_args_list
+        assert [call.kwargs["routing_key"] for call in calls] == ["a", "b", "c"]
+        assert calls[1].kwargs["properties"].content_type == "application/json"
+        # publishes get their own copy, aiormq stores the generated message_id in it
+        assert calls[2].kwargs["properties"].content_type == "text/plain"
+        assert properties.message_id is None
+
+    @pytest.mark.asyncio
+    async def test_publish_many_async_iterable(self, ops, mock_channel):
+        async def messages():
+            for i in range(3):
+                yield str(i), b"data", None
+
+        outcomes = await ops.publish_many("test_exchange", messages())
+        assert outcomes == [PublishOutcome.ACKED] * 3
+
+    @pytest.mark.asyncio
+    async def test_publish_many_window(self, ops, mock_channel, monkeypatch):
+        monkeypatch.setattr("rmqaio.rmqaio.config", Config(publish_many_window=2))
+        confirm = asyncio.Event()
+
+        async def basic_publish(*args, **kwds):
+            await confirm.wait()
+            return aiormq.spec.Basic.Ack()
+
+        mock_channel.basic_publish = AsyncMock(side_effect=basic_publish)
+        publish = asyncio.create_task(ops.publish_many("test_exchange", [(str(i), b"data", None) for i in range(5)]))
+        await asyncio.sleep(0.01)
+        assert mock_channel.basic_publish.call_count == 2
+        confirm.set()
+        assert await publish == [PublishOutcome.ACKED] * 5
+
+    @pytest.mark.asyncio
+    async def test_publish_many_error(self, ops, mock_channel):
+        mock_channel.basic_publish = AsyncMock(side_effect=aiormq.exceptions.ChannelInvalidStateError("closed"))
+        with pytest.raises(aiormq.exceptions.ChannelInvalidStateError):
+            await ops.publish_many("test_exchange", [("a", b"1", None)])
+
+
+class TestOpsReturn:
+    @pytest.fixture
+    def returned(self, ops, mock_channel):
+        message = MagicMock(delivery=aiormq.spec.Basic.Return(reply_code=312, reply_text="NO_ROUTE"))
+        mock_channel.basic_publish = AsyncMock(
+            side_effect=aiormq.exceptions.PublishError(message, aiormq.spec.Basic.Return())
+        )
+        received = []
+
+        async def callback(message):
+            received.append(message)
+
+        ops.set_return_callback("test", callback)
+        return message, received
+
+    @pytest.mark.asyncio
+    async def test_publish(self, ops, returned):
+        message, received = returned
+        with pytest.raises(aiormq.exceptions.PublishError):
+            await ops.publish("test_exchange", b"data", "key", mandatory=True)
+        assert received == [message]
+
+    @pytest.mark.asyncio
+    async def test_publish_no_wait(self, ops, returned):
+        message, received = returned
+        future = await ops.publish("test_exchange", b"data", "key", mandatory=True, wait=False)
+        with pytest.raises(aiormq.exceptions.PublishError):
+            await future
+        assert received == [message]
+
+    @pytest.mark.asyncio
+    async def test_publish_many(self, ops, returned):
+        message, received = returned
+        outcomes = await ops.publish_many("test_exchange", [("key", b"data", None)], mandatory=True)
+        assert outcomes == [PublishOutcome.RETURNED]
+        assert received == [message]
+
+    @pytest.mark.asyncio
+    async def test_unconfirmed(self, ops, mock_channel, returned):
+        message, received = returned
+        mock_channel.basic_publish = AsyncMock()
+        await ops.publish("test_exchange", b"data", "key", mandatory=True, confirm=False)
+        mock_channel._Channel__get_content_header = AsyncMock()
+        mock_channel._read_content = AsyncMock(return_value=message)
+        await mock_channel._on_return_frame(message.delivery)
+        assert received == [message]
+
+    @pytest.mark.asyncio
+    async def test_callback_error(self, ops, returned):
+        message, received = returned
+
+        async def failing(message):
+            raise RuntimeError
+
+        ops.set_return_callback("failing", failing)
+        await ops.publish_many("test_exchange", [("key", b"data", None)], mandatory=True)
+        assert received == [message]
+        await ops.remove_return_callback("test")
+        await ops.publish_many("test_exchange", [("key", b"data", None)], mandatory=True)
+        assert received == [message]
+
+    @pytest.mark.asyncio
+    async def test_properties(self, ops, mock_channel):
+        properties = BasicProperties(content_type="text/plain")
+        for mandatory in (False, True):
+            await ops.publish("test_exchange", b"data", "key", properties=properties, mandatory=mandatory)
+            sent = mock_channel.basic_publish.call_args.kwargs["properties"]
+            assert sent is not properties
+            assert sent.marshal() == properties.marshal()
+        properties = BasicProperties(message_id="1")
+        await ops.publish("test_exchange", b"data", "key", properties=properties, mandatory=True)
+        assert mock_channel.basic_publish.call_args.kwargs["properties"] is properties
+
+    @pytest.mark.asyncio
+    async def test_reused_properties_message_id(self, ops, mock_channel):
+        async def basic_publish(data, properties, **kwds):
+            # like aiormq, store the generated message_id in the properties object
+            if not properties.message_id:
+                properties.message_id = uuid.uuid4().hex
+
+        mock_channel.basic_publish = AsyncMock(side_effect=basic_publish)
+        properties = BasicProperties(content_type="text/plain")
+        await ops.publish("test_exchange", b"1", "key", properties=properties)
+        await ops.publish("test_exchange", b"2", "key", properties=properties)
+        first, second = (call.kwargs["properties"] for call in mock_channel.basic_publish.call_args_list)
+        assert first.message_id != second.message_id
+        assert properties.message_id is None
+
 
 class TestOpsConsume:
     @pytest.mark.asyncio
@@ -357,6 +619,25 @@ class TestOpsConsume:
 
         assert spec in ops._topology.consumers
 
+    @pytest.mark.asyncio
+    async def test_consume_body_as_memoryview(self, ops, mock_channel):
+        bodies = []
+
+        async def callback(channel, message):
+            bodies.append(message.body)
+
+        mock_channel.basic_consume = AsyncMock(return_value=MagicMock(consumer_tag="test_tag"))
+
+        spec = ConsumerSpec(queue="test_queue", callback=callback, body_as_memoryview=True)
+        await ops.consume(spec)
+
+        on_message = mock_channel.basic_consume.call_args[0][1]
+        body = b"data"
+        header = ContentHeader(body_size=len(body), properties=BasicProperties())
+        await on_message(aiormq.abc.DeliveredMessage(delivery=None, header=header, body=body, channel=mock_channel))
+        assert isinstance(bodies[0], memoryview)
+        assert bodies[0].obj is body
+
 
 class TestOpsStopConsume:
     @pytest.mark.asyncio
@@ -0,0 +1,166 @@
+import asyncio
+import sqlite3
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from rmqaio import ConnectionState, Outbox, PublishOutcome
+
+
+@pytest.fixture
+def database(tmp_path):
+    return tmp_path / "outbox.db"
+
+
+@pytest.fixture
+def mock_ops():
+    ops = MagicMock()
+    ops.conn = MagicMock()
+    ops.conn.is_open = True
+    ops.conn.remove_callback = AsyncMock()
+
+    async def publish_many(exchange, messages, **kwds):
+        return [PublishOutcome.ACKED for _ in messages]
+
+    ops.publish_many = AsyncMock(side_effect=publish_many)
+    return ops
+
+
+def count(database, table="rmqaio_outbox"):
+    with sqlite3.connect(database) as db:
+        return db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+class TestOutbox:
+    def test_invalid_table(self, mock_ops, database):
+        with pytest.raises(ValueError):
+            Outbox(mock_ops, database, table="outbox; DROP TABLE x")
+
+    @pytest.mark.asyncio
+    async def test_add_in_transaction(self, mock_ops, database):
+        outbox = Outbox(mock_ops, database)
+        db = sqlite3.connect(database)
+        outbox.create_table(db)
+        db.commit()
+
+        outbox.add(db, "exchange", b"1", "key")
+        db.rollback()
+        assert count(database) == 0
+
+        outbox.add(db, "exchange", b"2", "key", properties={"delivery_mode": 2})
+        db.commit()
+        db.close()
+        assert count(database) == 1
+
+        assert await outbox.flush() == 1
+        mock_ops.publish_many.assert_awaited_once_with(
+            "exchange",
+            [("key", b"2", {"delivery_mode": 2})],
+            mandatory=False,
+        )
+        assert count(database) == 0
+        await outbox.close()
+
+    @pytest.mark.asyncio
+    async def test_flush_groups_by_exchange(self, mock_ops, database):
+        outbox = Outbox(mock_ops, database, batch_size=3)
+        with sqlite3.connect(database) as db:
+            outbox.create_table(db)
+            outbox.add(db, "a", b"1", "key")
+            outbox.add(db, "a", b"2", "key")
+            outbox.add(db, "b", b"3", "key", mandatory=True)
+            outbox.add(db, "a", b"4", "key")
+
+        assert await outbox.flush() == 3
+        assert [call.args[0] for call in mock_ops.publish_many.await_args_list] == ["a", "b"]
+        assert mock_ops.publish_many.await_args_list[1].kwargs["mandatory"] is True
+        assert count(database) == 1
+        assert await outbox.flush() == 1
+        assert await outbox.flush() == 0
+        await outbox.close()
+
+    @pytest.mark.asyncio
+    async def test_flush_error_deletes_confirmed(self, mock_ops, database):
+        outbox = Outbox(mock_ops, database)
+        with sqlite3.connect(database) as db:
+            outbox.create_table(db)
+            outbox.add(db, "a", b"1", "key")
+            outbox.add(db, "b", b"2", "key")
+
+        async def publish_many(exchange, messages, **kwds):
+            if exchange == "b":
+                raise ConnectionError
+            return [PublishOutcome.ACKED for _ in messages]
+
+        mock_ops.publish_many.side_effect = publish_many
+        with pytest.raises(ConnectionError):
+            await outbox.flush()
+        assert count(database) == 1
+        await outbox.close()
+
+    @pytest.mark.asyncio
+    async def test_nacked_kept(self, mock_ops, database):
+        mock_ops.publish_many.side_effect = None
+        mock_ops.publish_many.return_value = [
+            PublishOutcome.ACKED,
+            PublishOutcome.NACKED,
+            PublishOutcome.RETURNED,
+        ]
+        outbox = Outbox(mock_ops, database)
+        with sqlite3.connect(database) as db:
+            outbox.create_table(db)
+            for data in (b"1", b"2", b"3"):
+                outbox.add(db, "exchange", data, "key")
+
+        assert await outbox.flush() == 2
+        with sqlite3.connect(database) as db:
+            assert db.execute("SELECT data FROM rmqaio_outbox").fetchall() == [(b"2",)]
+        await outbox.close()
+
+    @pytest.mark.asyncio
+    async def test_relay_retry(self, mock_ops, database):
+        published = []
+
+        async def publish_many(exchange, messages, **kwds):
+            if not published:
+                published.append(None)
+                raise ConnectionError
+            published.extend(messages)
+            return [PublishOutcome.ACKED for _ in messages]
+
+        mock_ops.publish_many.side_effect = publish_many
+        outbox = Outbox(mock_ops, database, flush_interval=0.01, retry_delay=0.01)
+        with sqlite3.connect(database) as db:
+            outbox.create_table(db)
+            outbox.add(db, "exchange", b"1", "key")
+
+        outbox.start()
+        for _ in range(100):
+            if count(database) == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert count(database) == 0
+        assert published[1:] == [("key", b"1", None)]
+        await outbox.close()
+
+    @pytest.mark.asyncio
+    async def test_relay_waits_for_connection(self, mock_ops, database):
+        mock_ops.conn.is_open = False
+        outbox = Outbox(mock_ops, database, flush_interval=0.01)
+        with sqlite3.connect(database) as db:
+            outbox.create_table(db)
+            outbox.add(db, "exchange", b"1", "key")
+
+        outbox.start()
+        await asyncio.sleep(0.05)
+        mock_ops.publish_many.assert_not_awaited()
+
+        await outbox._on_connection_state_changed(ConnectionState.CONNECTING, ConnectionState.CONNECTED)
+        for _ in range(100):
+            if count(database) == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert count(database) == 0
+        await outbox.close()
+        mock_ops.conn.remove_callback.assert_awaited_once()
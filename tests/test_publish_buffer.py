@@ -0,0 +1,159 @@
+import asyncio
+
+from unittest.mock import AsyncMock, MagicMock
+
+import aiormq
+import pytest
+
+from rmqaio import ConnectionState, PublishBuffer, PublishBufferFullError
+
+
+@pytest.fixture
+def confirmations():
+    return []
+
+
+@pytest.fixture
+def mock_ops(confirmations):
+    ops = MagicMock()
+    ops.conn = MagicMock()
+    ops.conn.is_open = True
+    ops.conn.remove_callback = AsyncMock()
+
+    async def publish(exchange, data, routing_key, **kwds):
+        future = asyncio.get_running_loop().create_future()
+        confirmations.append((data, kwds, future))
+        return future
+
+    ops.publish = AsyncMock(side_effect=publish)
+    return ops
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+class TestPublishBuffer:
+    @pytest.mark.asyncio
+    async def test_publish_and_flush(self, mock_ops, confirmations):
+        buffer = PublishBuffer(mock_ops)
+        buffer.start()
+        buffer.publish("exchange", b"1", "key", properties={"delivery_mode": 2})
+        buffer.publish("exchange", b"2", "key")
+        assert buffer.size == 2
+        await settle()
+
+        assert [data for data, _, _ in confirmations] == [b"1", b"2"]
+        assert confirmations[0][1]["properties"] == {"delivery_mode": 2}
+        assert confirmations[0][1]["wait"] is False
+        assert buffer.size == 2
+
+        for _, _, future in confirmations:
+            future.set_result(aiormq.spec.Basic.Ack())
+        await buffer.flush(timeout=1)
+        assert buffer.size == 0
+        assert buffer.memory_size == 0
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_full_without_spill(self, mock_ops):
+        buffer = PublishBuffer(mock_ops, memory_limit=3)
+        buffer.publish("exchange", b"123", "key")
+        with pytest.raises(PublishBufferFullError):
+            buffer.publish("exchange", b"4", "key")
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_spill_to_disk(self, mock_ops, confirmations, tmp_path):
+        buffer = PublishBuffer(mock_ops, memory_limit=2, spill_dir=tmp_path, segment_size=64)
+        for i in range(5):
+            buffer.publish("exchange", str(i).encode(), f"key.{i}", properties={"message_id": str(i)})
+        assert buffer.memory_size == 2
+        assert buffer.disk_size > 0
+        assert len(list(tmp_path.iterdir())) >= 1
+
+        buffer.start()
+        await settle()
+        assert [data for data, _, _ in confirmations] == [b"0", b"1", b"2", b"3", b"4"]
+        assert confirmations[4][1]["properties"] == {"message_id": "4"}
+        assert buffer.disk_size == 0
+
+        for _, _, future in confirmations:
+            future.set_result(aiormq.spec.Basic.Ack())
+        await buffer.flush(timeout=1)
+        await settle()
+        assert list(tmp_path.iterdir()) == []
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_disk_limit(self, mock_ops, tmp_path):
+        buffer = PublishBuffer(mock_ops, memory_limit=0, spill_dir=tmp_path, disk_limit=40)
+        buffer.publish("exchange", b"1", "key")
+        with pytest.raises(PublishBufferFullError):
+            buffer.publish("exchange", b"2", "key")
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_waits_for_connection(self, mock_ops, confirmations):
+        mock_ops.conn.is_open = False
+        buffer = PublishBuffer(mock_ops)
+        buffer.start()
+        buffer.publish("exchange", b"1", "key")
+        await settle()
+        assert confirmations == []
+
+        await buffer._on_connection_state_changed(ConnectionState.CONNECTING, ConnectionState.CONNECTED)
+        await settle()
+        assert len(confirmations) == 1
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_unconfirmed_republished_in_order(self, mock_ops, confirmations):
+        buffer = PublishBuffer(mock_ops)
+        buffer.start()
+        for i in range(3):
+            buffer.publish("exchange", str(i).encode(), "key")
+        await settle()
+        assert len(confirmations) == 3
+
+        await buffer._on_connection_state_changed(ConnectionState.CONNECTED, ConnectionState.RECONNECTING)
+        confirmations[0][2].set_result(aiormq.spec.Basic.Ack())
+        confirmations[2][2].set_exception(aiormq.exceptions.ChannelInvalidStateError("closed"))
+        confirmations[1][2].set_exception(aiormq.exceptions.ChannelInvalidStateError("closed"))
+        await settle()
+        assert buffer.size == 2
+
+        await buffer._on_connection_state_changed(ConnectionState.RECONNECTING, ConnectionState.CONNECTED)
+        await settle()
+        assert [data for data, _, _ in confirmations[3:]] == [b"1", b"2"]
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_nacked_republished_after_delay(self, mock_ops, confirmations):
+        buffer = PublishBuffer(mock_ops, retry_delay=0.05)
+        buffer.start()
+        buffer.publish("exchange", b"1", "key")
+        await settle()
+        confirmations[0][2].set_exception(aiormq.exceptions.DeliveryError(None, aiormq.spec.Basic.Nack()))
+        await settle()
+        assert len(confirmations) == 1
+        assert buffer.size == 1
+
+        await asyncio.sleep(0.1)
+        assert [data for data, _, _ in confirmations] == [b"1", b"1"]
+        confirmations[1][2].set_result(aiormq.spec.Basic.Ack())
+        await buffer.flush(timeout=1)
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_returned_message_dropped(self, mock_ops, confirmations):
+        buffer = PublishBuffer(mock_ops)
+        buffer.start()
+        buffer.publish("exchange", b"1", "key", mandatory=True)
+        await settle()
+        message = MagicMock(delivery=aiormq.spec.Basic.Return())
+        confirmations[0][2].set_exception(aiormq.exceptions.PublishError(message, aiormq.spec.Basic.Return()))
+        await buffer.flush(timeout=1)
+        assert buffer.size == 0
+        await buffer.close()
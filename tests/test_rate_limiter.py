@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from rmqaio import Exchange, ExchangeSpec, Ops, RateLimiter, RateLimitExceededError
+
+
+class TestRateLimiter:
+    def test_burst(self):
+        limiter = RateLimiter(messages_per_second=1, message_burst=2)
+        assert limiter.try_acquire()
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+        assert limiter.stats.messages == 2
+        assert limiter.stats.rejected == 1
+
+    def test_bytes(self):
+        limiter = RateLimiter(bytes_per_second=1000, byte_burst=100)
+        assert limiter.try_acquire(100)
+        assert not limiter.try_acquire(50)
+        assert limiter.stats.bytes == 100
+
+    @pytest.mark.parametrize(
+        "kwds",
+        [{"messages_per_second": 0}, {"bytes_per_second": -1}, {"messages_per_second": 1, "mode": "drop"}],
+    )
+    def test_invalid(self, kwds):
+        with pytest.raises(ValueError):
+            RateLimiter(**kwds)
+
+    def test_repr(self):
+        assert repr(RateLimiter(messages_per_second=10, bytes_per_second=100)) == "RateLimiter[10/s, 100B/s]"
+
+    @pytest.mark.asyncio
+    async def test_wait(self):
+        limiter = RateLimiter(messages_per_second=100, message_burst=1)
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(5)))
+        elapsed = time.monotonic() - started
+        assert 0.03 <= elapsed < 0.5
+        assert limiter.stats.messages == 5
+        assert limiter.stats.delayed == 4
+        assert limiter.stats.wait_time >= 0.03
+
+    @pytest.mark.asyncio
+    async def test_unlimited(self):
+        limiter = RateLimiter()
+        for _ in range(1000):
+            await limiter.acquire(1024)
+        assert limiter.stats.delayed == 0
+
+    @pytest.mark.asyncio
+    async def test_reject(self):
+        limiter = RateLimiter(messages_per_second=1, mode="reject")
+        await limiter.acquire()
+        with pytest.raises(RateLimitExceededError):
+            await limiter.acquire()
+        assert limiter.stats.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        limiter = RateLimiter(messages_per_second=1)
+        await limiter.acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire(timeout=0.01)
+        assert limiter.stats.rejected == 1
+        assert limiter._delay(0) > 0.9
+
+    @pytest.mark.asyncio
+    async def test_cancel_refunds(self):
+        limiter = RateLimiter(messages_per_second=10, message_burst=1)
+        await limiter.acquire()
+        task = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter._delay(0) <= 0.1
+        assert limiter.stats.messages == 1
+
+
+class TestPublishRateLimit:
+    @pytest.mark.asyncio
+    async def test_ops(self, mock_conn, mock_channel):
+        ops = Ops(mock_conn, rate_limiter=RateLimiter(bytes_per_second=10, mode="reject"))
+        await ops.publish("test_exchange", b"0123456789", "key")
+        with pytest.raises(RateLimitExceededError):
+            await ops.publish("test_exchange", b"0", "key")
+        mock_channel.basic_publish.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_shared(self, mock_conn):
+        limiter = RateLimiter(messages_per_second=1, mode="reject")
+        await Ops(mock_conn, rate_limiter=limiter).publish("test_exchange", b"data", "key")
+        with pytest.raises(RateLimitExceededError):
+            await Ops(mock_conn, rate_limiter=limiter).publish("test_exchange", b"data", "key")
+
+    @pytest.mark.asyncio
+    async def test_publish_many(self, mock_conn, mock_channel):
+        limiter = RateLimiter(messages_per_second=2, mode="reject")
+        ops = Ops(mock_conn, rate_limiter=limiter)
+        with pytest.raises(RateLimitExceededError):
+            await ops.publish_many("test_exchange", [("key", b"data", None)] * 3)
+        assert limiter.stats.messages == 2
+
+    @pytest.mark.asyncio
+    async def test_exchange(self):
+        limiter = RateLimiter(messages_per_second=1, mode="reject")
+        exchange = Exchange(ExchangeSpec(name="test"), AsyncMock(), rate_limiter=limiter)
+        await exchange.publish(b"data", "key")
+        with pytest.raises(RateLimitExceededError):
+            await exchange.publish(b"data", "key")
+        exchange.ops.publish.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_exchange_publish_many(self):
+        limiter = RateLimiter(messages_per_second=100, message_burst=1)
+        ops = AsyncMock()
+
+        async def publish_many(exchange, messages, **kwds):
+            return [message async for message in messages]
+
+        ops.publish_many = AsyncMock(side_effect=publish_many)
+        exchange = Exchange(ExchangeSpec(name="test"), ops, rate_limiter=limiter)
+        messages = [("key", b"data", None)] * 3
+        assert await exchange.publish_many(messages) == messages
+        assert limiter.stats.delayed == 2
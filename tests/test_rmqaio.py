@@ -4,9 +4,11 @@ import itertools
 
 from dataclasses import FrozenInstanceError
 from ssl import PROTOCOL_TLS_CLIENT, SSLContext
+from types import SimpleNamespace
 from unittest import mock
 
 import aiormq
+import pamqp.frame
 import pytest
 
 from rmqaio import (
@@ -23,6 +25,8 @@ from rmqaio.rmqaio import (
     _as_int_or_none,
     _env_var_as_bool,
     _env_var_as_int,
+    _log_data,
+    _split_body,
     retry,
 )
 
@@ -64,6 +68,32 @@ class TestConfig:
             Config()
 
 
+class TestBody:
+    def test_log_data(self, monkeypatch):
+        monkeypatch.setattr("rmqaio.rmqaio.config", Config(log_sanitize=False, log_data_truncate_size=4))
+        assert _log_data(b"0123") == b"0123"
+        assert _log_data(b"0123456789") == b"0123<truncated>"
+        assert _log_data(memoryview(b"0123456789")) == b"0123<truncated>"
+        assert _log_data(bytearray(b"01")) == b"01"
+
+    def test_log_data_sanitize(self, monkeypatch):
+        monkeypatch.setattr("rmqaio.rmqaio.config", Config(log_sanitize=True))
+        assert _log_data(memoryview(b"data")) == "<hidden>"
+
+    @pytest.mark.parametrize("body", [b"", b"012", b"0123456789"])
+    def test_split_body(self, body):
+        channel = SimpleNamespace(max_content_size=4)
+        buffer = bytearray(body)
+        frames = _split_body(channel, memoryview(buffer))
+        expected = aiormq.Channel._split_body(channel, body)
+        assert [pamqp.frame.marshal(frame, 1) for frame in frames] == [
+            pamqp.frame.marshal(frame, 1) for frame in expected
+        ]
+        if buffer:
+            buffer[0] = ord("x")
+            assert frames[0].value[0] == ord("x")
+
+
 class TestRetryPolicy:
     def test_default_values(self):
         policy = RetryPolicy()
@@ -312,7 +342,11 @@ class TestConnection:
     async def test_open(self, mock_aiormq):
         conn = Connection("amqp://admin@example.com")
         await conn.open()
-        mock_aiormq.assert_awaited_once_with("amqp://admin@example.com", context=None)
+        mock_aiormq.assert_called_once()
+        assert mock_aiormq.call_args.args == ("amqp://admin@example.com",)
+        assert mock_aiormq.call_args.kwargs.get("context") is None
+        assert mock_aiormq.call_args.kwargs.get("transport_factory") is conn._transport_factory
+        conn._conn.connect.assert_awaited_once()
         assert conn.is_open is True
         assert conn.is_closed is False
         await conn.close()
@@ -322,13 +356,13 @@ class TestConnection:
         conn = Connection("amqp://admin@example.com")
         await conn.open()
         await conn.open()
-        mock_aiormq.assert_awaited_once()
+        mock_aiormq.assert_called_once()
         await conn.close()
 
     @pytest.mark.asyncio
     async def test_open_connection_failure(self):
-        with mock.patch("aiormq.connect", new_callable=mock.AsyncMock) as mock_connect:
-            mock_connect.side_effect = Exception("Connection failed")
+        with mock.patch("aiormq.Connection") as mock_connection:
+            mock_connection.return_value.connect = mock.AsyncMock(side_effect=Exception("Connection failed"))
             conn = Connection("amqp://admin@example.com")
             with pytest.raises(Exception, match="Connection failed"):
                 await conn.open()
@@ -340,7 +374,7 @@ class TestConnection:
         conn = Connection("amqp://admin@example.com", ssl_context=ssl_ctx)
         await conn.open()
 
-        mock_aiormq.assert_awaited_once()
+        mock_aiormq.assert_called_once()
         call_kwargs = mock_aiormq.call_args.kwargs
         assert call_kwargs.get("context") is ssl_ctx
 
@@ -552,7 +586,8 @@ class TestCallbackSystem:
         async def callback(state_from, state_to):
             transitions.append((state_from, state_to))
 
-        with mock.patch("aiormq.connect", new_callable=mock.AsyncMock, side_effect=Exception("boom")):
+        with mock.patch("aiormq.Connection") as mock_connection:
+            mock_connection.return_value.connect = mock.AsyncMock(side_effect=Exception("boom"))
             conn = Connection("amqp://admin@example.com", open_retry_policy=RetryPolicy(delays=[]))
             conn.set_callback("recorder", callback)
 
@@ -751,7 +786,9 @@ class TestSharedConnection:
     async def test_open_close(self, mock_aiormq):
         conn = SharedConnection("amqp://admin@example.com")
         await conn.open()
-        mock_aiormq.assert_awaited_once_with("amqp://admin@example.com", context=None)
+        mock_aiormq.assert_called_once()
+        assert mock_aiormq.call_args.args == ("amqp://admin@example.com",)
+        assert mock_aiormq.call_args.kwargs.get("transport_factory") is conn.connection._transport_factory
         assert conn.is_open is True
         assert conn.is_closed is False
         await conn.close()
@@ -763,7 +800,7 @@ class TestSharedConnection:
         conn = SharedConnection("amqp://admin@example.com")
         await conn.open()
         await conn.open()
-        mock_aiormq.assert_awaited_once()
+        mock_aiormq.assert_called_once()
         await conn.close()
 
     @pytest.mark.asyncio
@@ -0,0 +1,269 @@
+import asyncio
+
+from unittest.mock import AsyncMock, MagicMock
+
+import aiormq
+import pytest
+
+from pamqp.header import ContentHeader
+
+from rmqaio import (
+    BasicProperties,
+    ConnectionInvalidStateError,
+    ConnectionState,
+    Ops,
+    Queue,
+    QueueSpec,
+    RpcClient,
+    RpcError,
+    RpcServer,
+)
+
+
+def reply(correlation_id, body=b"reply"):
+    header = ContentHeader(body_size=len(body), properties=BasicProperties(correlation_id=correlation_id))
+    return aiormq.abc.DeliveredMessage(delivery=None, header=header, body=body, channel=MagicMock())
+
+
+@pytest.fixture
+def rpc(mock_conn):
+    mock_conn.remove_callback = AsyncMock()
+    return RpcClient(Ops(mock_conn), timeout=1)
+
+
+def requests(mock_channel):
+    return [call.kwargs["properties"] for call in mock_channel.basic_publish.call_args_list]
+
+
+class TestRpcClient:
+    @pytest.mark.asyncio
+    async def test_call(self, rpc, mock_conn, mock_channel):
+        async def basic_publish(data, **kwds):
+            asyncio.get_running_loop().call_soon(
+                asyncio.ensure_future, rpc._on_reply(reply(kwds["properties"].correlation_id, data[::-1]))
+            )
+
+        mock_channel.basic_publish = AsyncMock(side_effect=basic_publish)
+        message = await rpc.call("rpc.echo", b"request")
+        assert message.body == b"tseuqer"
+        assert rpc.pending == 0
+
+        mock_conn.new_channel.assert_awaited_once_with(timeout=1, publisher_confirms=False)
+        mock_channel.basic_consume.assert_awaited_once_with(
+            "amq.rabbitmq.reply-to", rpc._on_reply, no_ack=True, timeout=1
+        )
+        call = mock_channel.basic_publish.call_args
+        assert call.kwargs["exchange"] == ""
+        assert call.kwargs["routing_key"] == "rpc.echo"
+        assert call.kwargs["mandatory"] is True
+        assert call.kwargs["properties"].reply_to == "amq.rabbitmq.reply-to"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls(self, rpc, mock_channel):
+        calls = [asyncio.create_task(rpc.call("rpc", str(i).encode())) for i in range(100)]
+        await asyncio.sleep(0)
+        assert rpc.pending == 100
+        for properties, data in reversed(
+            list(zip(requests(mock_channel), [call.args[0] for call in mock_channel.basic_publish.call_args_list]))
+        ):
+            await rpc._on_reply(reply(properties.correlation_id, data))
+        assert [(await call).body for call in calls] == [str(i).encode() for i in range(100)]
+        mock_channel.basic_consume.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_timeout(self, rpc, mock_channel):
+        slow = asyncio.create_task(rpc.call("rpc", b"slow", timeout=10))
+        fast = asyncio.create_task(rpc.call("rpc", b"fast", timeout=0.01))
+        await asyncio.sleep(0)
+        assert len(rpc._deadlines) == 2
+        with pytest.raises(asyncio.TimeoutError):
+            await fast
+        assert not slow.done()
+        assert rpc._timer is not None
+        await rpc._on_reply(reply(requests(mock_channel)[0].correlation_id))
+        await slow
+        assert rpc.pending == 0
+        await rpc.close()
+        assert rpc._timer is None
+
+    @pytest.mark.asyncio
+    async def test_completed_deadlines_compacted(self, rpc, mock_channel):
+        async def basic_publish(data, **kwds):
+            asyncio.get_running_loop().call_soon(
+                asyncio.ensure_future, rpc._on_reply(reply(kwds["properties"].correlation_id))
+            )
+
+        mock_channel.basic_publish = AsyncMock(side_effect=basic_publish)
+        for _i in range(1000):
+            await rpc.call("rpc", b"data", timeout=60)
+        assert len(rpc._deadlines) <= 32
+        await rpc.close()
+
+    @pytest.mark.asyncio
+    async def test_error_reply(self, rpc, mock_channel):
+        call = asyncio.create_task(rpc.call("rpc", b"data"))
+        await asyncio.sleep(0)
+        header = ContentHeader(
+            properties=BasicProperties(
+                correlation_id=requests(mock_channel)[0].correlation_id,
+                headers={"x-rpc-error": b"RuntimeError: db down"},
+            )
+        )
+        await rpc._on_reply(aiormq.abc.DeliveredMessage(delivery=None, header=header, body=b"", channel=MagicMock()))
+        with pytest.raises(RpcError, match="RuntimeError: db down"):
+            await call
+
+    @pytest.mark.asyncio
+    async def test_late_reply(self, rpc, mock_channel):
+        with pytest.raises(asyncio.TimeoutError):
+            await rpc.call("rpc", b"data", timeout=0.01)
+        await rpc._on_reply(reply(requests(mock_channel)[0].correlation_id))
+        await rpc._on_reply(reply("unknown"))
+
+    @pytest.mark.asyncio
+    async def test_connection_lost(self, rpc, mock_channel):
+        call = asyncio.create_task(rpc.call("rpc", b"data"))
+        await asyncio.sleep(0)
+        await rpc._on_connection_state_changed(ConnectionState.CONNECTED, ConnectionState.RECONNECTING)
+        with pytest.raises(ConnectionInvalidStateError, match="connection lost"):
+            await call
+        assert rpc._channel is None
+
+    @pytest.mark.asyncio
+    async def test_returned(self, rpc, mock_channel):
+        call = asyncio.create_task(rpc.call("rpc", b"data"))
+        await asyncio.sleep(0)
+        frame = aiormq.spec.Basic.Return(reply_code=312, reply_text="NO_ROUTE", routing_key="rpc")
+        message = aiormq.abc.DeliveredMessage(
+            delivery=frame,
+            header=ContentHeader(properties=requests(mock_channel)[0]),
+            body=b"data",
+            channel=mock_channel,
+        )
+        mock_channel._Channel__get_content_header = AsyncMock()
+        mock_channel._read_content = AsyncMock(return_value=message)
+        await mock_channel._on_return_frame(frame)
+        with pytest.raises(aiormq.exceptions.PublishError):
+            await call
+
+    @pytest.mark.asyncio
+    async def test_close(self, rpc, mock_conn, mock_channel):
+        async with rpc:
+            call = asyncio.create_task(rpc.call("rpc", b"data"))
+            await asyncio.sleep(0)
+        with pytest.raises(ConnectionInvalidStateError, match="rpc client closed"):
+            await call
+        mock_channel.close.assert_awaited_once()
+        mock_conn.remove_callback.assert_awaited_once_with(f"rpc_client[{id(rpc)}]")
+
+
+def request(delivery_tag, body=b"request", reply_to="amq.rabbitmq.reply-to.client"):
+    header = ContentHeader(
+        body_size=len(body),
+        properties=BasicProperties(reply_to=reply_to, correlation_id=str(delivery_tag)),
+    )
+    return aiormq.abc.DeliveredMessage(
+        delivery=aiormq.spec.Basic.Deliver(delivery_tag=delivery_tag),
+        header=header,
+        body=body,
+        channel=MagicMock(),
+    )
+
+
+@pytest.fixture
+def queue(mock_conn):
+    return Queue(QueueSpec(name="rpc"), Ops(mock_conn))
+
+
+class TestRpcServer:
+    def test_invalid_concurrency(self, queue):
+        with pytest.raises(ValueError, match="concurrency must be positive"):
+            RpcServer(queue, AsyncMock(), concurrency=0)
+
+    @pytest.mark.asyncio
+    async def test_start_stop(self, queue, mock_channel):
+        server = RpcServer(queue, AsyncMock(), concurrency=4)
+        consumer = await server.start()
+        mock_channel.basic_qos.assert_awaited_once_with(prefetch_count=4, prefetch_size=None, timeout=None)
+        assert mock_channel.basic_consume.call_args.kwargs["no_ack"] is False
+        await server.stop()
+        mock_channel.basic_cancel.assert_awaited_once_with(consumer.consumer_tag, timeout=None)
+
+    @pytest.mark.asyncio
+    async def test_reply(self, queue, mock_channel):
+        events = []
+        mock_channel.basic_publish = AsyncMock(side_effect=lambda *args, **kwds: events.append("reply"))
+        mock_channel.basic_ack = AsyncMock(side_effect=lambda *args, **kwds: events.append("ack"))
+
+        async def handler(message):
+            return message.body[::-1], {"content_type": "text/plain"}
+
+        server = RpcServer(queue, handler)
+        await server._on_request(mock_channel, request(7, b"abc"))
+        assert events == ["reply", "ack"]
+        call = mock_channel.basic_publish.call_args
+        assert call.args[0] == b"cba"
+        assert call.kwargs["routing_key"] == "amq.rabbitmq.reply-to.client"
+        assert call.kwargs["properties"].correlation_id == "7"
+        assert call.kwargs["properties"].content_type == "text/plain"
+        assert call.kwargs["wait"] is False
+        mock_channel.basic_ack.assert_awaited_once_with(7)
+
+    @pytest.mark.asyncio
+    async def test_no_reply(self, queue, mock_channel):
+        server = RpcServer(queue, AsyncMock(return_value=b"reply"))
+        await server._on_request(mock_channel, request(1, reply_to=None))
+        server = RpcServer(queue, AsyncMock(return_value=None))
+        await server._on_request(mock_channel, request(2))
+        mock_channel.basic_publish.assert_not_awaited()
+        assert mock_channel.basic_ack.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_reply_error(self, queue, mock_channel):
+        mock_channel.basic_publish = AsyncMock(side_effect=aiormq.exceptions.ChannelInvalidStateError)
+        server = RpcServer(queue, AsyncMock(return_value=b"reply"))
+        with pytest.raises(aiormq.exceptions.ChannelInvalidStateError):
+            await server._on_request(mock_channel, request(1))
+        mock_channel.basic_ack.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_handler_error(self, queue, mock_channel):
+        server = RpcServer(queue, AsyncMock(side_effect=RuntimeError("db down")))
+        await server._on_request(mock_channel, request(3))
+        mock_channel.basic_reject.assert_awaited_once_with(3, requeue=False)
+        call = mock_channel.basic_publish.call_args
+        assert call.args[0] == b""
+        assert call.kwargs["properties"].correlation_id == "3"
+        assert call.kwargs["properties"].headers == {"x-rpc-error": "RuntimeError: db down"}
+
+    @pytest.mark.asyncio
+    async def test_handler_error_no_reply_to(self, queue, mock_channel):
+        server = RpcServer(queue, AsyncMock(side_effect=RuntimeError))
+        await server._on_request(mock_channel, request(3, reply_to=None))
+        mock_channel.basic_reject.assert_awaited_once_with(3, requeue=False)
+        mock_channel.basic_publish.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_concurrency(self, queue, mock_channel):
+        running = 0
+        max_running = 0
+        release = asyncio.Event()
+
+        async def handler(message):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await release.wait()
+            running -= 1
+            return b"reply"
+
+        server = RpcServer(queue, handler, concurrency=2)
+        tasks = [asyncio.create_task(server._on_request(mock_channel, request(i))) for i in range(5)]
+        await asyncio.sleep(0.01)
+        assert running == 2
+        assert server.in_flight == 5
+        release.set()
+        await server.stop()
+        assert all(task.done() for task in tasks)
+        assert max_running == 2
+        assert mock_channel.basic_ack.await_count == 5
@@ -0,0 +1,160 @@
+import json
+import zlib
+
+from unittest.mock import AsyncMock, MagicMock
+
+import aiormq
+import pytest
+
+from pamqp.header import ContentHeader
+
+from rmqaio import (
+    BasicProperties,
+    Compression,
+    Config,
+    ConsumerSpec,
+    DefaultExchange,
+    Exchange,
+    ExchangeSpec,
+    JsonSerializer,
+    MessageTemplate,
+    Ops,
+    PickleSerializer,
+    Serializer,
+    get_serializer,
+    register_serializer,
+)
+from rmqaio.rmqaio import _serializers
+
+
+class ReprSerializer(Serializer):
+    content_type = "text/x-repr"
+
+    def dumps(self, obj):
+        return repr(obj).encode()
+
+    def loads(self, data):
+        return bytes(data).decode()
+
+
+@pytest.fixture
+def repr_serializer():
+    register_serializer(ReprSerializer())
+    yield
+    _serializers.pop("text/x-repr")
+
+
+def publish_args(exchange):
+    call = exchange.ops.publish.call_args
+    return call.args[1], call.kwargs["properties"]
+
+
+class TestSerializers:
+    @pytest.mark.parametrize("serializer", [JsonSerializer(), PickleSerializer()])
+    def test_roundtrip(self, serializer):
+        obj = {"user": "alice", "ids": [1, 2, 3]}
+        data = serializer.dumps(obj)
+        assert serializer.loads(data) == obj
+        assert serializer.loads(memoryview(data)) == obj
+
+    def test_json_options(self):
+        assert JsonSerializer(separators=(",", ":")).dumps({"a": 1}) == b'{"a":1}'
+
+    def test_registry(self, repr_serializer):
+        assert isinstance(get_serializer("application/json"), JsonSerializer)
+        assert isinstance(get_serializer("application/python-pickle"), PickleSerializer)
+        assert isinstance(get_serializer("text/x-repr"), ReprSerializer)
+
+    def test_unknown(self):
+        with pytest.raises(ValueError, match="unknown serializer 'text/unknown'"):
+            get_serializer("text/unknown")
+
+
+class TestPublishSerialization:
+    @pytest.mark.asyncio
+    async def test_publish(self):
+        exchange = Exchange(ExchangeSpec(name="test"), AsyncMock(), serializer="application/json")
+        await exchange.publish({"a": 1}, "key", properties={"delivery_mode": 2})
+        data, properties = publish_args(exchange)
+        assert json.loads(data) == {"a": 1}
+        assert properties == {"delivery_mode": 2, "content_type": "application/json"}
+
+    @pytest.mark.asyncio
+    async def test_default_exchange(self, repr_serializer):
+        exchange = DefaultExchange(AsyncMock(), serializer=ReprSerializer())
+        await exchange.publish([1], "key")
+        assert publish_args(exchange) == (b"[1]", {"content_type": "text/x-repr"})
+
+    def test_unknown(self):
+        with pytest.raises(ValueError, match="unknown serializer 'text/unknown'"):
+            Exchange(ExchangeSpec(name="test"), AsyncMock(), serializer="text/unknown")
+
+    @pytest.mark.asyncio
+    async def test_template(self):
+        exchange = Exchange(ExchangeSpec(name="test"), AsyncMock(), serializer="application/json")
+        template = MessageTemplate(content_type="application/json", app_id="app")
+        await exchange.publish({"a": 1}, "key", properties=template)
+        _, properties = publish_args(exchange)
+        assert properties.content_type is template.properties.content_type
+        assert properties.marshal() == BasicProperties(content_type="application/json", app_id="app").marshal()
+
+    @pytest.mark.asyncio
+    async def test_compression(self):
+        exchange = Exchange(
+            ExchangeSpec(name="test"),
+            AsyncMock(),
+            serializer="application/json",
+            compression=Compression(threshold=0),
+        )
+        await exchange.publish({"a": 1}, "key")
+        data, properties = publish_args(exchange)
+        assert json.loads(zlib.decompress(data)) == {"a": 1}
+        assert properties == {"content_type": "application/json", "content_encoding": "zlib"}
+
+    @pytest.mark.asyncio
+    async def test_offload(self, monkeypatch):
+        monkeypatch.setattr("rmqaio.rmqaio.config", Config(executor_threshold=100))
+        exchange = Exchange(ExchangeSpec(name="test"), AsyncMock(), serializer="application/json")
+        await exchange.publish("x" * 200, "key")
+        assert exchange._encoder.offload is True
+        await exchange.publish("x", "key")
+        assert publish_args(exchange)[0] == b'"x"'
+        assert exchange._encoder.offload is False
+
+
+class TestConsumeDeserialization:
+    async def deliver(self, mock_conn, body, serializer, **properties):
+        received = []
+
+        async def callback(channel, message):
+            received.append(message.body)
+
+        ops = Ops(mock_conn)
+        spec = ConsumerSpec(queue="queue", callback=callback, decompress=True, serializer=serializer)
+        on_message = ops._on_message(spec, None)
+        header = ContentHeader(body_size=len(body), properties=BasicProperties(**properties))
+        await on_message(aiormq.abc.DeliveredMessage(delivery=None, header=header, body=body, channel=MagicMock()))
+        return received[0]
+
+    @pytest.mark.asyncio
+    async def test_deserialize(self, mock_conn):
+        assert await self.deliver(mock_conn, b'{"a": 1}', "application/json") == {"a": 1}
+
+    @pytest.mark.asyncio
+    async def test_decompress_and_deserialize(self, mock_conn):
+        body = zlib.compress(b'{"a": 1}')
+        assert await self.deliver(mock_conn, body, JsonSerializer(), content_encoding="zlib") == {"a": 1}
+
+    @pytest.mark.asyncio
+    async def test_offload(self, mock_conn, monkeypatch):
+        monkeypatch.setattr("rmqaio.rmqaio.config", Config(executor_threshold=0))
+        assert await self.deliver(mock_conn, b"[1, 2]", "application/json") == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_without_serializer(self, mock_conn):
+        body = await self.deliver(mock_conn, b'{"a": 1}', None, content_type="application/json")
+        assert body == b'{"a": 1}'
+
+    def test_unknown(self):
+        with pytest.raises(ValueError, match="unknown serializer 'text/unknown'"):
+            ConsumerSpec(queue="queue", callback=AsyncMock(), serializer="text/unknown")
@@ -2,13 +2,14 @@ from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from rmqaio import DefaultExchange, Exchange, ExchangeSpec, Queue, QueueSpec
+from rmqaio import DefaultExchange, DeliveryGuarantee, Exchange, ExchangeSpec, Queue, QueueSpec
 
 
 @pytest.fixture
 def mock_ops():
     ops = AsyncMock()
     ops.publish = AsyncMock()
+    ops.publish_many = AsyncMock()
     ops.check_exchange_exists = AsyncMock()
     ops.exchange_declare = AsyncMock()
     ops.delete = AsyncMock()
@@ -40,6 +41,8 @@ class TestDefaultExchange:
             properties=None,
             mandatory=False,
             timeout=None,
+            wait=True,
+            confirm=True,
         )
 
     @pytest.mark.asyncio
@@ -54,6 +57,8 @@ class TestDefaultExchange:
             properties=properties,
             mandatory=True,
             timeout=30,
+            wait=True,
+            confirm=True,
         )
 
 
@@ -128,6 +133,8 @@ class TestExchange:
             properties=None,
             mandatory=False,
             timeout=None,
+            wait=True,
+            confirm=True,
         )
 
     @pytest.mark.asyncio
@@ -143,8 +150,33 @@ class TestExchange:
             properties=properties,
             mandatory=True,
             timeout=30,
+            wait=True,
+            confirm=True,
         )
 
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "delivery, wait, confirm",
+        [
+            (DeliveryGuarantee.FIRE_AND_FORGET, True, False),
+            (DeliveryGuarantee.ASYNC_CONFIRM, False, True),
+            (DeliveryGuarantee.SYNC_CONFIRM, True, True),
+        ],
+    )
+    async def test_publish_delivery(self, mock_ops, delivery, wait, confirm):
+        spec = ExchangeSpec(name="test_exchange")
+        exchange = Exchange(spec=spec, ops=mock_ops, delivery=delivery)
+        await exchange.publish(b"test_data", "test.key")
+        assert mock_ops.publish.call_args.kwargs["wait"] is wait
+        assert mock_ops.publish.call_args.kwargs["confirm"] is confirm
+
+    @pytest.mark.asyncio
+    async def test_publish_many(self, mock_ops):
+        exchange = Exchange(spec=ExchangeSpec(name="test_exchange"), ops=mock_ops)
+        messages = [("test.key", b"test_data", None)]
+        await exchange.publish_many(messages, mandatory=True)
+        mock_ops.publish_many.assert_called_once_with("test_exchange", messages, mandatory=True, timeout=None)
+
 
 class TestQueue:
     def test_init(self, mock_ops):